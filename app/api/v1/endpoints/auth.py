@@ -23,7 +23,7 @@ router = APIRouter()
 @router.post(
     "/register", response_model=UserSchema, status_code=status.HTTP_201_CREATED
 )
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+def register(user: UserCreate, db: Session = Depends(get_db)):
     """Register a new user."""
     # Check if user with email already exists
     db_user = get_user_by_email(db, email=user.email)
@@ -46,7 +46,7 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/token", response_model=Token)
-async def login_for_access_token(
+def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
 ):
     """Login to get access token."""
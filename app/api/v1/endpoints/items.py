@@ -2,65 +2,99 @@
 Items endpoints for CRUD operations.
 """
 
-from typing import List
+import hashlib
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
 
 from app.auth import get_current_active_user
 from app.crud import (
     create_item,
-    delete_item,
+    delete_item_if_owner,
     get_item_by_id,
+    get_item_owner,
     get_items,
-    get_items_count,
     update_item,
 )
 from app.database import get_db
 from app.models import User
-from app.schemas import Item, ItemCreate, ItemUpdate, PaginatedResponse
+from app.pagination import build_item_page
+from app.schemas import (
+    Item,
+    ItemCreate,
+    ItemUpdate,
+    PaginatedResponse,
+    item_list_adapter,
+)
 
 router = APIRouter()
 
+ITEM_CACHE_CONTROL = "private, max-age=0, must-revalidate"
+
+
+def _item_etag(body: bytes) -> str:
+    """Build a weak ETag from a digest of the serialized item."""
+    # Hashing the body covers every field, including the embedded owner, and
+    # does not depend on the database's timestamp resolution
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
 
 @router.get("/", response_model=PaginatedResponse)
-async def read_items(
+def read_items(
     skip: int = Query(0, ge=0, description="Number of items to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of items to return"),
+    after_id: Optional[int] = Query(
+        None, ge=0, description="Return items with an ID greater than this cursor"
+    ),
+    include_total: bool = Query(
+        False,
+        description=(
+            "Count all matching items to report total and pages; paging needs "
+            "only has_more and next_cursor"
+        ),
+    ),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """Get paginated list of items."""
-    items = get_items(db, skip=skip, limit=limit)
-    total = get_items_count(db)
-
-    pages = (total + limit - 1) // limit
-    page = (skip // limit) + 1
-
-    return PaginatedResponse(
-        items=items,
-        total=total,
-        page=page,
-        size=limit,
-        pages=pages,
+    return build_item_page(
+        db, skip=skip, limit=limit, after_id=after_id, include_total=include_total
     )
 
 
 @router.get("/my-items", response_model=List[Item])
-async def read_my_items(
+def read_my_items(
     skip: int = Query(0, ge=0, description="Number of items to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of items to return"),
+    after_id: Optional[int] = Query(
+        None, ge=0, description="Return items with an ID greater than this cursor"
+    ),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """Get current user's items."""
-    items = get_items(db, skip=skip, limit=limit, owner_id=current_user.id)
-    return items
+    items = get_items(
+        db, skip=skip, limit=limit, owner_id=current_user.id, after_id=after_id
+    )
+    validated = item_list_adapter.validate_python(items, from_attributes=True)
+    return Response(
+        content=item_list_adapter.dump_json(validated), media_type="application/json"
+    )
 
 
 @router.get("/{item_id}", response_model=Item)
-async def read_item(
+def read_item(
     item_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
@@ -71,11 +105,18 @@ async def read_item(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Item not found",
         )
-    return item
+
+    body = Item.model_validate(item).model_dump_json().encode()
+    etag = _item_etag(body)
+    headers = {"ETag": etag, "Cache-Control": ITEM_CACHE_CONTROL}
+    # Let clients revalidate a cached copy without re-sending the body
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.post("/", response_model=Item, status_code=status.HTTP_201_CREATED)
-async def create_new_item(
+def create_new_item(
     item: ItemCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
@@ -85,55 +126,49 @@ async def create_new_item(
 
 
 @router.put("/{item_id}", response_model=Item)
-async def update_existing_item(
+def update_existing_item(
     item_id: int,
     item_update: ItemUpdate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """Update an existing item."""
-    # Check if item exists and belongs to current user
-    existing_item = get_item_by_id(db, item_id=item_id)
-    if existing_item is None:
+    updated_item = update_item(
+        db=db, item_id=item_id, item_update=item_update, owner_id=current_user.id
+    )
+    if updated_item is not None:
+        return updated_item
+
+    # Nothing matched: tell a missing item apart from someone else's
+    if get_item_owner(db, item_id=item_id) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Item not found",
         )
-
-    if existing_item.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions",
-        )
-
-    updated_item = update_item(db=db, item_id=item_id, item_update=item_update)
-    return updated_item
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="Not enough permissions",
+    )
 
 
 @router.delete("/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_existing_item(
+def delete_existing_item(
     item_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """Delete an existing item."""
-    # Check if item exists and belongs to current user
-    existing_item = get_item_by_id(db, item_id=item_id)
-    if existing_item is None:
+    existed, deleted = delete_item_if_owner(
+        db=db, item_id=item_id, owner_id=current_user.id
+    )
+    if not existed:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Item not found",
         )
 
-    if existing_item.owner_id != current_user.id:
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
         )
-
-    success = delete_item(db=db, item_id=item_id)
-    if not success:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to delete item",
-        )
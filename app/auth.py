@@ -2,8 +2,12 @@
 Authentication utilities and JWT token management.
 """
 
-from datetime import datetime, timedelta
-from typing import Optional
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Iterator, Optional, Tuple
 
 from fastapi import Depends, HTTPException, Security, status
 from fastapi.security import (
@@ -11,16 +15,36 @@ from fastapi.security import (
     HTTPBearer,
     OAuth2PasswordBearer,
 )
-from jose import JWTError, jwt
+from jose import JWTError, jwk, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import Session, make_transient_to_detached
 
+from app.cache import TTLCache
 from app.config import settings
 from app.database import get_db
 from app.models import User
 
 # Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# New hashes use Argon2id; bcrypt hashes still verify and are upgraded on login
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__memory_cost=settings.argon2_memory_cost,
+    argon2__rounds=settings.argon2_rounds,
+    bcrypt__ident="2b",
+    bcrypt__rounds=settings.bcrypt_rounds,
+)
+
+# Caps concurrent password hashing so a login burst cannot tie up every
+# worker thread; callers that cannot get a slot in time are turned away
+_password_hash_slots = threading.BoundedSemaphore(settings.password_hash_concurrency)
+PASSWORD_HASH_WAIT_SECONDS = 1.0
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when no password hashing slot frees up in time."""
+
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
@@ -28,30 +52,64 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 # HTTP Bearer scheme for API key authentication
 http_bearer = HTTPBearer(auto_error=False)
 
+# JWT signing key and decode arguments, built once instead of per request
+_jwt_key = jwk.construct(settings.secret_key, settings.algorithm)
+_jwt_algorithms = (settings.algorithm,)
+_jwt_decode_options = {"require_exp": True, "require_sub": True, "verify_aud": False}
+
+# Verified tokens, keyed by SHA-256 digest, so repeat requests skip jwt.decode
+_token_cache: TTLCache[str] = TTLCache(maxsize=10_000, ttl=5)
+
+# Detached snapshots of recently authenticated users, keyed by username.
+# The cache is per process and only the writing process invalidates it, so
+# with several workers a deactivated, demoted or deleted user keeps their
+# access elsewhere for up to user_cache_ttl_seconds; keep that TTL short.
+_user_cache: TTLCache[User] = TTLCache(
+    maxsize=5_000, ttl=settings.user_cache_ttl_seconds
+)
+
+
+@contextmanager
+def _password_hash_slot() -> Iterator[None]:
+    """Reserve a password hashing slot or fail when saturated."""
+    if not _password_hash_slots.acquire(timeout=PASSWORD_HASH_WAIT_SECONDS):
+        raise PasswordHashingBusy("Too many concurrent authentication requests")
+    try:
+        yield
+    finally:
+        _password_hash_slots.release()
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    with _password_hash_slot():
+        return pwd_context.verify(plain_password, hashed_password)
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """Verify a password, returning a replacement hash if the scheme is outdated."""
+    with _password_hash_slot():
+        return pwd_context.verify_and_update(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Generate password hash."""
-    return pwd_context.hash(password)
+    with _password_hash_slot():
+        return pwd_context.hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token."""
     to_encode = data.copy()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        lifetime = expires_delta.total_seconds()
     else:
-        expire = datetime.utcnow() + timedelta(
-            minutes=settings.access_token_expire_minutes
-        )
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(
-        to_encode, settings.secret_key, algorithm=settings.algorithm
-    )
+        lifetime = settings.access_token_expire_minutes * 60
+    # An epoch int is what ends up in the claim; skip building a datetime
+    to_encode.update({"exp": int(time.time() + lifetime)})
+    encoded_jwt = jwt.encode(to_encode, _jwt_key, algorithm=settings.algorithm)
     return encoded_jwt
 
 
@@ -59,21 +117,65 @@ def verify_token(token: str) -> Optional[str]:
     """Verify JWT token and return username."""
     if token is None:
         return None
+
+    cache_key = hashlib.sha256(token.encode()).digest()
+    username = _token_cache.get(cache_key)
+    if username is not None:
+        return username
+
     try:
         payload = jwt.decode(
-            token, settings.secret_key, algorithms=[settings.algorithm]
+            token,
+            _jwt_key,
+            algorithms=_jwt_algorithms,
+            options=_jwt_decode_options,
         )
-        username: str = payload.get("sub")
-        if username is None:
-            return None
-        return username
     except JWTError:
         return None
 
+    # require_sub guarantees a string subject, so no None check is needed
+    username = payload["sub"]
+
+    # Never serve a cached token past its own expiry
+    _token_cache.set(cache_key, username, ttl=payload["exp"] - time.time())
+    return username
+
 
 def get_user(db: Session, username: str) -> Optional[User]:
     """Get user by username."""
-    return db.query(User).filter(User.username == username).first()
+    stmt = select(User).where(User.username == username)
+    return db.execute(stmt).scalar_one_or_none()
+
+
+def _snapshot_user(user: User) -> User:
+    """Copy a loaded user into a detached instance that is safe to share."""
+    snapshot = User(
+        **{column.key: getattr(user, column.key) for column in User.__table__.columns}
+    )
+    make_transient_to_detached(snapshot)
+    return snapshot
+
+
+def get_cached_user(db: Session, username: str) -> Optional[User]:
+    """Get user by username, serving recent lookups without a query."""
+    snapshot = _user_cache.get(username)
+    if snapshot is not None:
+        return db.merge(snapshot, load=False)
+
+    user = get_user(db, username)
+    if user is not None:
+        _user_cache.set(username, _snapshot_user(user))
+    return user
+
+
+def invalidate_cached_user(username: str) -> None:
+    """Drop a cached user after their record changes."""
+    _user_cache.pop(username)
+
+
+def clear_user_cache() -> None:
+    """Drop all cached users."""
+    _user_cache.clear()
 
 
 def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
@@ -81,12 +183,17 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
     user = get_user(db, username)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = verify_and_update_password(password, user.hashed_password)
+    if not verified:
         return None
+    if new_hash is not None:
+        user.hashed_password = new_hash
+        db.commit()
+        invalidate_cached_user(user.username)
     return user
 
 
-async def get_current_user(
+def get_current_user(
     token: Optional[str] = Depends(oauth2_scheme), db: Session = Depends(get_db)
 ) -> User:
     """Get current authenticated user."""
@@ -103,7 +210,7 @@ async def get_current_user(
     if username is None:
         raise credentials_exception
 
-    user = get_user(db, username=username)
+    user = get_cached_user(db, username=username)
     if user is None:
         raise credentials_exception
 
@@ -138,7 +245,7 @@ def get_current_user_optional(
         # Try JWT authentication
         username = verify_token(token)
         if username:
-            user = get_user(db, username)
+            user = get_cached_user(db, username)
             if user:
                 return user
 
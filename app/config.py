@@ -2,7 +2,9 @@
 Configuration management for the FastAPI application.
 """
 
-from typing import List, Optional
+import os
+from functools import cached_property, lru_cache
+from typing import FrozenSet, Optional, Tuple
 
 from pydantic import Field
 from pydantic_settings import BaseSettings
@@ -30,6 +32,11 @@ class Settings(BaseSettings):
     secret_key: str = Field(default="your-secret-key-change-in-production")
     algorithm: str = Field(default="HS256")
     access_token_expire_minutes: int = Field(default=30)
+    user_cache_ttl_seconds: int = Field(default=5)
+    password_hash_concurrency: int = Field(default_factory=lambda: os.cpu_count() or 1)
+    argon2_memory_cost: int = Field(default=65536)
+    argon2_rounds: int = Field(default=3)
+    bcrypt_rounds: int = Field(default=12)
 
     # Logging settings
     log_level: str = Field(default="INFO")
@@ -56,28 +63,36 @@ class Settings(BaseSettings):
         default="/docs,/redoc,/openapi.json,/health,/metrics,/"
     )
 
-    def api_keys(self) -> List[str]:
-        """Get API keys as a list, parsing from comma-separated string if needed."""
+    @cached_property
+    def api_keys(self) -> FrozenSet[str]:
+        """Get API keys as a set, parsed once from the comma-separated string."""
         if self.api_keys_raw is None:
-            return []
-        # api_keys_raw is guaranteed to be a string here
-        return [key.strip() for key in self.api_keys_raw.split(",") if key.strip()]
-
-    def exclude_api_key_paths(self) -> List[str]:
-        """Get exclude paths as list, parsing from comma-separated string if needed."""
+            return frozenset()
+        return frozenset(
+            key.strip() for key in self.api_keys_raw.split(",") if key.strip()
+        )
+
+    @cached_property
+    def exclude_api_key_paths(self) -> Tuple[str, ...]:
+        """Get exclude path prefixes, parsed once from the comma-separated string."""
         if self.exclude_api_key_paths_raw is None:
-            return ["/docs", "/redoc", "/openapi.json", "/health", "/metrics", "/"]
-        # exclude_api_key_paths_raw is guaranteed to be a string here
-        return [
+            return ("/docs", "/redoc", "/openapi.json", "/health", "/metrics", "/")
+        return tuple(
             path.strip()
             for path in self.exclude_api_key_paths_raw.split(",")
             if path.strip()
-        ]
+        )
 
     class Config:
         env_file = ".env"
         case_sensitive = False
 
 
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Get the application settings, loading them only once per process."""
+    return Settings()
+
+
 # Global settings instance
-settings = Settings()
+settings = get_settings()
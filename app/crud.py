@@ -2,12 +2,12 @@
 CRUD operations for database interactions.
 """
 
-from typing import List, Optional, cast
+from typing import List, Optional, Tuple, cast
 
-from sqlalchemy import func
+from sqlalchemy import delete, func, select, update
 from sqlalchemy.orm import Session
 
-from app.auth import get_password_hash
+from app.auth import clear_user_cache, get_password_hash, invalidate_cached_user
 from app.models import Item, User
 from app.schemas import ItemCreate, ItemUpdate, UserCreate, UserUpdate
 
@@ -16,22 +16,23 @@ from app.schemas import ItemCreate, ItemUpdate, UserCreate, UserUpdate
 
 def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
     """Get user by ID."""
-    return db.query(User).filter(User.id == user_id).first()
+    return db.execute(select(User).where(User.id == user_id)).scalar_one_or_none()
 
 
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
     """Get user by email."""
-    return db.query(User).filter(User.email == email).first()
+    return db.execute(select(User).where(User.email == email)).scalar_one_or_none()
 
 
 def get_user_by_username(db: Session, username: str) -> Optional[User]:
     """Get user by username."""
-    return db.query(User).filter(User.username == username).first()
+    stmt = select(User).where(User.username == username)
+    return db.execute(stmt).scalar_one_or_none()
 
 
 def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[User]:
     """Get users with pagination."""
-    return db.query(User).offset(skip).limit(limit).all()
+    return list(db.execute(select(User).offset(skip).limit(limit)).scalars())
 
 
 def create_user(db: Session, user: UserCreate) -> User:
@@ -52,16 +53,21 @@ def create_user(db: Session, user: UserCreate) -> User:
 
 def update_user(db: Session, user_id: int, user_update: UserUpdate) -> Optional[User]:
     """Update user information."""
-    db_user = get_user_by_id(db, user_id)
-    if not db_user:
-        return None
-
-    update_data = user_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_user, field, value)
+    update_data = user_update.model_dump(exclude_unset=True)
+    if not update_data:
+        return get_user_by_id(db, user_id)
 
+    stmt = update(User).where(User.id == user_id).values(**update_data).returning(User)
+    db_user = db.execute(stmt).scalar_one_or_none()
     db.commit()
-    db.refresh(db_user)
+    if db_user is None:
+        return None
+
+    if "username" in update_data:
+        # The previous username is not known without another round-trip
+        clear_user_cache()
+    else:
+        invalidate_cached_user(db_user.username)
     return db_user
 
 
@@ -71,6 +77,7 @@ def delete_user(db: Session, user_id: int) -> bool:
     if not db_user:
         return False
 
+    invalidate_cached_user(db_user.username)
     db.delete(db_user)
     db.commit()
     return True
@@ -81,28 +88,65 @@ def delete_user(db: Session, user_id: int) -> bool:
 
 def get_item_by_id(db: Session, item_id: int) -> Optional[Item]:
     """Get item by ID."""
-    return db.query(Item).filter(Item.id == item_id).first()
+    return db.execute(select(Item).where(Item.id == item_id)).scalar_one_or_none()
+
+
+def get_item_owner(db: Session, item_id: int) -> Optional[int]:
+    """Get the owner ID of an item without loading the item."""
+    stmt = select(Item.owner_id).where(Item.id == item_id)
+    return db.execute(stmt).scalar_one_or_none()
 
 
 def get_items(
-    db: Session, skip: int = 0, limit: int = 100, owner_id: Optional[int] = None
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    owner_id: Optional[int] = None,
+    after_id: Optional[int] = None,
 ) -> List[Item]:
-    """Get items with pagination and optional owner filter."""
-    query = db.query(Item)
+    """Get items ordered by ID, paginated by offset or by a keyset cursor."""
+    stmt = select(Item)
     if owner_id is not None:
-        query = query.filter(Item.owner_id == owner_id)
-    return query.offset(skip).limit(limit).all()
+        stmt = stmt.where(Item.owner_id == owner_id)
+    if after_id is not None:
+        stmt = stmt.where(Item.id > after_id)
+    stmt = stmt.order_by(Item.id).offset(skip).limit(limit)
+    return list(db.execute(stmt).scalars())
 
 
 def get_items_count(db: Session, owner_id: Optional[int] = None) -> int:
     """Get total count of items."""
-    query = db.query(func.count(Item.id))
+    stmt = select(func.count(Item.id))
     if owner_id is not None:
-        query = query.filter(Item.owner_id == owner_id)
-    result = cast(int, query.scalar())
+        stmt = stmt.where(Item.owner_id == owner_id)
+    result = cast(Optional[int], db.execute(stmt).scalar())
     return result if result is not None else 0
 
 
+def get_items_page(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    owner_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+) -> Tuple[List[Item], int]:
+    """Get a page of items and the total count of items in a single query."""
+    # The total ignores the cursor, so count in a subquery rather than a window
+    total = select(func.count(Item.id))
+    if owner_id is not None:
+        total = total.where(Item.owner_id == owner_id)
+    stmt = select(Item, total.scalar_subquery().label("total"))
+    if owner_id is not None:
+        stmt = stmt.where(Item.owner_id == owner_id)
+    if after_id is not None:
+        stmt = stmt.where(Item.id > after_id)
+    rows = db.execute(stmt.order_by(Item.id).offset(skip).limit(limit)).all()
+    if not rows:
+        # Past the last page there is no row to carry the total
+        return [], get_items_count(db, owner_id=owner_id) if skip or after_id else 0
+    return [item for item, _ in rows], rows[0].total
+
+
 def create_item(db: Session, item: ItemCreate, owner_id: int) -> Item:
     """Create a new item."""
     db_item = Item(**item.dict(), owner_id=owner_id)
@@ -112,18 +156,24 @@ def create_item(db: Session, item: ItemCreate, owner_id: int) -> Item:
     return db_item
 
 
-def update_item(db: Session, item_id: int, item_update: ItemUpdate) -> Optional[Item]:
-    """Update item information."""
-    db_item = get_item_by_id(db, item_id)
-    if not db_item:
-        return None
+def update_item(
+    db: Session,
+    item_id: int,
+    item_update: ItemUpdate,
+    owner_id: Optional[int] = None,
+) -> Optional[Item]:
+    """Update item information, optionally only if owned by the given user."""
+    conditions = [Item.id == item_id]
+    if owner_id is not None:
+        conditions.append(Item.owner_id == owner_id)
 
-    update_data = item_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_item, field, value)
+    update_data = item_update.model_dump(exclude_unset=True)
+    if not update_data:
+        return db.execute(select(Item).where(*conditions)).scalar_one_or_none()
 
+    stmt = update(Item).where(*conditions).values(**update_data).returning(Item)
+    db_item = db.execute(stmt).scalar_one_or_none()
     db.commit()
-    db.refresh(db_item)
     return db_item
 
 
@@ -138,6 +188,22 @@ def delete_item(db: Session, item_id: int) -> bool:
     return True
 
 
+def delete_item_if_owner(db: Session, item_id: int, owner_id: int) -> Tuple[bool, bool]:
+    """Delete an item owned by the given user, returning (existed, deleted)."""
+    stmt = (
+        delete(Item)
+        .where(Item.id == item_id, Item.owner_id == owner_id)
+        .returning(Item.id)
+    )
+    deleted_id = db.execute(stmt).scalar_one_or_none()
+    db.commit()
+    if deleted_id is not None:
+        return True, True
+
+    # Only the miss path pays for telling a missing item from a foreign one
+    return get_item_owner(db, item_id) is not None, False
+
+
 def get_user_items(
     db: Session, user_id: int, skip: int = 0, limit: int = 100
 ) -> List[Item]:
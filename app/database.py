@@ -2,40 +2,92 @@
 Database configuration and session management.
 """
 
-from typing import Generator
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Generator, Hashable, Iterator, Optional
 
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
 from sqlalchemy.pool import QueuePool
+from starlette.concurrency import run_in_threadpool
 
 from app.config import settings
 
-# Create database engine with connection pooling
+# Create database engine with connection pooling; kept small since PgBouncer
+# multiplexes the per-worker pools onto a shared set of server connections
 engine = create_engine(
     settings.database_url,
     poolclass=QueuePool,
     pool_size=settings.database_pool_size,
     max_overflow=settings.database_max_overflow,
     pool_pre_ping=True,
-    pool_recycle=3600,
+    pool_recycle=600,
+    query_cache_size=1200,
     echo=settings.debug,
 )
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Marker for the request currently being served, set by the session scopes
+_request_scope: ContextVar[Optional[object]] = ContextVar("request_scope", default=None)
+
+
+def _session_scope_key() -> Hashable:
+    """Key sessions by request, falling back to the current thread."""
+    scope = _request_scope.get()
+    return scope if scope is not None else threading.get_ident()
+
+
+# Create session registry; one session is shared per request. Objects stay
+# loaded after commit so rows returned by UPDATE ... RETURNING serialize
+# without being fetched again
+SessionLocal = scoped_session(
+    sessionmaker(
+        autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+    ),
+    scopefunc=_session_scope_key,
+)
 
 # Create base class for models
 Base = declarative_base()
 
 
+@contextmanager
+def session_scope() -> Iterator[None]:
+    """Share one session with everything run inside the block, then release it."""
+    token = _request_scope.set(object())
+    try:
+        yield
+    finally:
+        SessionLocal.remove()
+        _request_scope.reset(token)
+
+
+@asynccontextmanager
+async def request_session_scope() -> AsyncIterator[None]:
+    """Share one session with a request, then close it off the event loop."""
+    token = _request_scope.set(object())
+    try:
+        yield
+    finally:
+        # Closing rolls back and checks the connection into the pool, which
+        # is blocking I/O; unregister here, then close in the threadpool
+        if SessionLocal.registry.has():
+            session = SessionLocal.registry()
+            SessionLocal.registry.clear()
+            await run_in_threadpool(session.close)
+        _request_scope.reset(token)
+
+
 def get_db() -> Generator[Session, None, None]:
     """Dependency to get database session."""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
+        # Request-scoped sessions are released when the scope exits
+        if _request_scope.get() is None:
+            SessionLocal.remove()
 
 
 def init_db() -> None:
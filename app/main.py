@@ -3,20 +3,21 @@ Main FastAPI application.
 """
 
 from contextlib import asynccontextmanager
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional
 
-from fastapi import Depends, FastAPI, Query
+from fastapi import Depends, FastAPI, Query, Request, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 from app.api.v1.endpoints import auth, items
-from app.auth import get_current_active_user_optional
+from app.auth import PasswordHashingBusy, get_current_active_user_optional
 from app.config import settings
-from app.crud import get_items, get_items_count
 from app.database import get_db, init_db
 from app.middleware import setup_middleware
 from app.models import User
+from app.pagination import build_item_page
 from app.schemas import HealthCheck, PaginatedResponse
 
 
@@ -38,6 +39,7 @@ app = FastAPI(
     docs_url="/docs" if settings.debug else None,
     redoc_url="/redoc" if settings.debug else None,
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     # Remove any global security requirements
     openapi_tags=[
         {
@@ -52,6 +54,17 @@ app = FastAPI(
 # Setup middleware
 setup_middleware(app)
 
+
+@app.exception_handler(PasswordHashingBusy)
+async def password_hashing_busy_handler(request: Request, exc: PasswordHashingBusy):
+    """Ask clients to retry shortly when password hashing is saturated."""
+    return ORJSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"},
+    )
+
+
 # Include API routers
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["authentication"])
 app.include_router(items.router, prefix="/api/v1/items", tags=["items"])
@@ -68,7 +81,7 @@ async def root():
 
 
 @app.get("/health", response_model=HealthCheck, tags=["public"])
-async def health_check(db: Session = Depends(get_db)):
+def health_check(db: Session = Depends(get_db)):
     """Health check endpoint."""
     # Test database connection and initialize tables if needed
     try:
@@ -85,7 +98,7 @@ async def health_check(db: Session = Depends(get_db)):
 
     return HealthCheck(
         status="healthy" if db_status == "healthy" else "unhealthy",
-        timestamp=datetime.utcnow(),
+        timestamp=datetime.now(timezone.utc),
         version=settings.app_version,
         database=db_status,
     )
@@ -104,23 +117,23 @@ async def metrics():
 
 
 @app.get("/public/items", response_model=PaginatedResponse, tags=["public"])
-async def read_public_items(
+def read_public_items(
     skip: int = Query(0, ge=0, description="Number of items to skip"),
     limit: int = Query(10, ge=1, le=100, description="Number of items to return"),
+    after_id: Optional[int] = Query(
+        None, ge=0, description="Return items with an ID greater than this cursor"
+    ),
+    include_total: bool = Query(
+        False,
+        description=(
+            "Count all matching items to report total and pages; paging needs "
+            "only has_more and next_cursor"
+        ),
+    ),
     db: Session = Depends(get_db),
     current_user: Optional[User] = Depends(get_current_active_user_optional),
 ):
     """Get public list of items (no authentication required)."""
-    items = get_items(db, skip=skip, limit=limit)
-    total = get_items_count(db)
-
-    pages = (total + limit - 1) // limit
-    page = (skip // limit) + 1
-
-    return PaginatedResponse(
-        items=items,
-        total=total,
-        page=page,
-        size=limit,
-        pages=pages,
+    return build_item_page(
+        db, skip=skip, limit=limit, after_id=after_id, include_total=include_total
     )
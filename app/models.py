@@ -2,7 +2,16 @@
 SQLAlchemy models for the application.
 """
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -32,6 +41,7 @@ class Item(Base):
     """Item model for the main business logic."""
 
     __tablename__ = "items"
+    __table_args__ = (Index("ix_items_owner_id_id", "owner_id", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), index=True, nullable=False)
@@ -0,0 +1,60 @@
+"""
+Pagination helpers shared by the item list endpoints.
+"""
+
+from typing import Optional, Tuple
+
+from sqlalchemy.orm import Session
+from starlette.responses import Response
+
+from app.crud import get_items, get_items_page
+from app.schemas import PaginatedResponse, item_list_adapter
+
+
+def page_numbers(
+    skip: int, limit: int, total: Optional[int]
+) -> Tuple[int, Optional[int]]:
+    """Get the 1-based page number and the page count for an offset and limit."""
+    page = skip // limit + 1
+    if total is None:
+        return page, None
+    pages, remainder = divmod(total, limit)
+    return page, pages + (remainder > 0)
+
+
+def build_item_page(
+    db: Session,
+    skip: int,
+    limit: int,
+    after_id: Optional[int],
+    include_total: bool,
+    owner_id: Optional[int] = None,
+) -> Response:
+    """Build a serialized page of items for the paginated list endpoints."""
+    # Fetch one row past the page to learn whether another page follows
+    if include_total:
+        items, total = get_items_page(
+            db, skip=skip, limit=limit + 1, owner_id=owner_id, after_id=after_id
+        )
+    else:
+        items = get_items(
+            db, skip=skip, limit=limit + 1, owner_id=owner_id, after_id=after_id
+        )
+        total = None
+    has_more = len(items) > limit
+    items = items[:limit]
+
+    page, pages = page_numbers(skip, limit, total)
+
+    # Validate the rows once and serialize directly, skipping FastAPI's second pass
+    validated = item_list_adapter.validate_python(items, from_attributes=True)
+    response = PaginatedResponse.model_construct(
+        items=validated,
+        total=total,
+        page=page,
+        size=limit,
+        pages=pages,
+        has_more=has_more,
+        next_cursor=validated[-1].id if has_more else None,
+    )
+    return Response(content=response.model_dump_json(), media_type="application/json")
@@ -5,7 +5,7 @@ Pydantic schemas for request/response validation.
 from datetime import datetime
 from typing import List, Optional
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, TypeAdapter
 
 # User schemas
 
@@ -42,14 +42,13 @@ class UserInDB(UserBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class User(UserInDB):
     """Schema for user response."""
 
-    pass
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 
 # Item schemas
@@ -85,8 +84,7 @@ class ItemInDB(ItemBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class Item(ItemInDB):
@@ -94,8 +92,7 @@ class Item(ItemInDB):
 
     owner: User
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 
 # Token schemas
@@ -130,7 +127,13 @@ class PaginatedResponse(BaseModel):
     """Schema for paginated responses."""
 
     items: List[Item]
-    total: int
+    total: Optional[int] = None
     page: int
     size: int
-    pages: int
+    pages: Optional[int] = None
+    has_more: bool = False
+    next_cursor: Optional[int] = None
+
+
+# Built once so list responses reuse the compiled validator and serializer
+item_list_adapter = TypeAdapter(List[Item])
@@ -0,0 +1,77 @@
+"""
+Benchmarks for the items endpoints.
+"""
+
+import pytest
+
+# Enough rows that paging and counting do real work
+SEEDED_ITEMS = 1000
+
+
+@pytest.fixture
+def seeded_items(make_items):
+    """Seed the items table for the list benchmarks."""
+    make_items(SEEDED_ITEMS)
+
+
+class TestItemsBenchmarks:
+    """Benchmark the hot items request paths."""
+
+    def test_list_items(self, benchmark, client, auth_headers, seeded_items):
+        """Benchmark listing a page of items with the total count."""
+        response = benchmark(
+            client.get,
+            "/api/v1/items/?skip=0&limit=100&include_total=true",
+            headers=auth_headers,
+        )
+
+        assert response.status_code == 200
+        assert response.json()["total"] == SEEDED_ITEMS
+
+    def test_list_items_by_cursor(self, benchmark, client, auth_headers, seeded_items):
+        """Benchmark keyset paging without the total count."""
+        response = benchmark(
+            client.get,
+            "/api/v1/items/?after_id=500&limit=100",
+            headers=auth_headers,
+        )
+
+        assert response.status_code == 200
+        assert len(response.json()["items"]) == 100
+
+    def test_read_item(self, benchmark, client, auth_headers, test_item):
+        """Benchmark reading a single item."""
+        response = benchmark(
+            client.get, f"/api/v1/items/{test_item.id}", headers=auth_headers
+        )
+
+        assert response.status_code == 200
+
+    def test_create_item(self, benchmark, client, auth_headers):
+        """Benchmark creating an item."""
+        item_data = {"title": "Bench Item", "price": 100}
+        response = benchmark(
+            client.post, "/api/v1/items/", json=item_data, headers=auth_headers
+        )
+
+        assert response.status_code == 201
+
+    def test_item_lifecycle(self, benchmark, client, auth_headers):
+        """Benchmark creating, updating and deleting an item."""
+
+        def lifecycle():
+            item = client.post(
+                "/api/v1/items/",
+                json={"title": "Bench Item", "price": 100},
+                headers=auth_headers,
+            ).json()
+            client.put(
+                f"/api/v1/items/{item['id']}",
+                json={"price": 200},
+                headers=auth_headers,
+            )
+            return client.delete(f"/api/v1/items/{item['id']}", headers=auth_headers)
+
+        response = benchmark(lifecycle)
+
+        assert response.status_code == 204
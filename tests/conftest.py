@@ -2,25 +2,76 @@
 Test configuration and fixtures.
 """
 
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, insert
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from app.auth import get_password_hash
+from app.auth import (
+    clear_user_cache,
+    create_access_token,
+    get_password_hash,
+    pwd_context,
+)
 from app.database import Base, get_db
 from app.main import app
 from app.models import Item, User
 
-# Test database configuration
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+# Override the configured hashing costs with the cheapest ones; the hash
+# format is unchanged
+pwd_context.update(
+    argon2__memory_cost=8, argon2__rounds=1, argon2__parallelism=1, bcrypt__rounds=4
+)
+
+# Hash the fixture passwords once rather than in every fixture call
+TEST_PASSWORD_HASH = get_password_hash("testpassword")
+ADMIN_PASSWORD_HASH = get_password_hash("adminpassword")
+
+# Test database configuration: one shared in-memory connection
+SQLALCHEMY_DATABASE_URL = "sqlite://"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Match the app's session configuration, including expire_on_commit
+TestingSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
+
+
+@event.listens_for(engine, "connect")
+def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+    """Let SQLAlchemy emit BEGIN itself so SAVEPOINTs work with pysqlite."""
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine, "connect")
+def _set_test_pragmas(dbapi_connection, connection_record):
+    """Trade durability the test database never needs for fewer syscalls."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=MEMORY")
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+@event.listens_for(engine, "begin")
+def _begin_transaction(conn):
+    """Start the transaction pysqlite no longer begins implicitly."""
+    conn.exec_driver_sql("BEGIN")
+
+
+@pytest.fixture(autouse=True)
+def reset_user_cache():
+    """Keep cached users from leaking between tests."""
+    yield
+    clear_user_cache()
 
 
 def override_get_db():
@@ -32,18 +83,23 @@ def override_get_db():
         db.close()
 
 
+@pytest.fixture(scope="session")
 def db_engine():
-    """Create test database engine."""
+    """Create the test schema once for the whole session."""
     Base.metadata.create_all(bind=engine)
     yield engine
     Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture
 def db_session(db_engine):
-    """Create test database session."""
+    """Create a test session whose work is rolled back after each test."""
     connection = db_engine.connect()
     transaction = connection.begin()
-    session = TestingSessionLocal(bind=connection)
+    # Commits inside the test only release a SAVEPOINT on the outer transaction
+    session = TestingSessionLocal(
+        bind=connection, join_transaction_mode="create_savepoint"
+    )
 
     yield session
 
@@ -52,45 +108,54 @@ def db_session(db_engine):
     connection.close()
 
 
-def client(db_session):
-    """Create test client with database override."""
-    app.dependency_overrides[get_db] = lambda: db_session
+@pytest.fixture(scope="session")
+def app_client():
+    """Create a test client whose app lifespan runs once per test session."""
     with TestClient(app) as test_client:
+        # Tests call exact paths; a redirect should surface, not be followed
+        test_client.follow_redirects = False
         yield test_client
-    app.dependency_overrides.clear()
 
 
+@pytest.fixture
+def client(app_client, db_session):
+    """Point the shared test client at this test's database session."""
+    with patch.dict(app.dependency_overrides, {get_db: lambda: db_session}):
+        yield app_client
+
+
+@pytest.fixture
 def test_user(db_session):
     """Create a test user."""
     user = User(
         email="test@example.com",
         username="testuser",
-        hashed_password=get_password_hash("testpassword"),
+        hashed_password=TEST_PASSWORD_HASH,
         full_name="Test User",
         is_active=True,
     )
     db_session.add(user)
-    db_session.commit()
-    db_session.refresh(user)
+    db_session.flush()
     return user
 
 
+@pytest.fixture
 def test_superuser(db_session):
     """Create a test superuser."""
     user = User(
         email="admin@example.com",
         username="admin",
-        hashed_password=get_password_hash("adminpassword"),
+        hashed_password=ADMIN_PASSWORD_HASH,
         full_name="Admin User",
         is_active=True,
         is_superuser=True,
     )
     db_session.add(user)
-    db_session.commit()
-    db_session.refresh(user)
+    db_session.flush()
     return user
 
 
+@pytest.fixture
 def test_item(db_session, test_user):
     """Create a test item."""
     item = Item(
@@ -100,26 +165,66 @@ def test_item(db_session, test_user):
         owner_id=test_user.id,
     )
     db_session.add(item)
-    db_session.commit()
-    db_session.refresh(item)
+    db_session.flush()
     return item
 
 
-def auth_headers(client, test_user):
-    """Get authentication headers for test user."""
-    response = client.post(
-        "/api/v1/auth/token",
-        data={"username": test_user.username, "password": "testpassword"},
+@pytest.fixture
+def other_item(db_session):
+    """Create an item owned by a user other than the test user."""
+    other_user = User(
+        email="other@example.com",
+        username="otheruser",
+        hashed_password="hashed_password",
+        is_active=True,
     )
-    token = response.json()["access_token"]
-    return {"Authorization": f"Bearer {token}"}
+    item = Item(title="Other Item", price=100, owner=other_user)
+    # Both rows are written by a single flush
+    db_session.add(item)
+    db_session.flush()
+    return item
+
+
+@pytest.fixture
+def make_items(db_session, test_user):
+    """Bulk-insert numbered items owned by the test user."""
+
+    def make(count, title="Item"):
+        db_session.execute(
+            insert(Item),
+            [
+                {
+                    "title": f"{title} {i}",
+                    "description": f"Description {i}",
+                    "price": 100 * i,
+                    "owner_id": test_user.id,
+                }
+                for i in range(1, count + 1)
+            ],
+        )
+
+    return make
 
 
-def admin_headers(client, test_superuser):
+@pytest.fixture(scope="session")
+def user_token():
+    """Sign the test user's token once; it only carries the username."""
+    return create_access_token({"sub": "testuser"}, expires_delta=timedelta(hours=24))
+
+
+@pytest.fixture(scope="session")
+def admin_token():
+    """Sign the admin user's token once; it only carries the username."""
+    return create_access_token({"sub": "admin"}, expires_delta=timedelta(hours=24))
+
+
+@pytest.fixture
+def auth_headers(client, test_user, user_token):
+    """Get authentication headers for test user."""
+    return {"Authorization": f"Bearer {user_token}"}
+
+
+@pytest.fixture
+def admin_headers(client, test_superuser, admin_token):
     """Get authentication headers for admin user."""
-    response = client.post(
-        "/api/v1/auth/token",
-        data={"username": test_superuser.username, "password": "adminpassword"},
-    )
-    token = response.json()["access_token"]
-    return {"Authorization": f"Bearer {token}"}
+    return {"Authorization": f"Bearer {admin_token}"}
@@ -2,55 +2,17 @@
 Integration tests for authentication endpoints.
 """
 
-from fastapi import FastAPI, status
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
-
-from app.api.v1.endpoints import auth as auth_endpoints
-from app.auth import get_password_hash
-from app.database import get_db
-from app.models import Base, User
-
-# Create a test database for these tests
-test_engine = create_engine(
-    "sqlite:///./test_integration_auth.db",
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
-TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
-
-
-def override_get_db():
-    """Override database dependency for testing."""
-    try:
-        db = TestSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-
-# Create a new FastAPI app for testing
-test_app = FastAPI()
-test_app.include_router(auth_endpoints.router, prefix="/api/v1/auth", tags=["auth"])
-test_app.dependency_overrides[get_db] = override_get_db
-client = TestClient(test_app)
+import threading
+from unittest.mock import patch
+
+import pytest
+from fastapi import status
 
 
 class TestAuthEndpoints:
     """Test authentication endpoints integration."""
 
-    def setup_method(self):
-        """Set up test database before each test."""
-        # Create all tables using the test engine
-        Base.metadata.create_all(bind=test_engine)
-
-    def teardown_method(self):
-        """Clean up test database after each test."""
-        Base.metadata.drop_all(bind=test_engine)
-
-    def test_register_user_success(self):
+    def test_register_user_success(self, client):
         """Test successful user registration."""
         user_data = {
             "email": "newuser@example.com",
@@ -69,55 +31,24 @@ class TestAuthEndpoints:
         assert "password" not in data
         assert data["id"] is not None
 
-    def test_register_user_duplicate_email(self):
-        """Test registration with duplicate email."""
-        # Create a test user first
-        session = TestSessionLocal()
-        test_user = User(
-            email="test@example.com",
-            username="testuser",
-            hashed_password=get_password_hash("testpassword"),
-            full_name="Test User",
-            is_active=True,
-        )
-        session.add(test_user)
-        session.commit()
-        session.refresh(test_user)
-        test_email = test_user.email  # Get the email before closing session
-        session.close()
-
-        user_data = {
-            "email": test_email,
-            "username": "differentuser",
-            "password": "password123",
-            "full_name": "Different User",
-        }
-
-        response = client.post("/api/v1/auth/register", json=user_data)
-
-        assert response.status_code == status.HTTP_400_BAD_REQUEST
-        assert "Email already registered" in response.json()["detail"]
-
-    def test_register_user_duplicate_username(self):
-        """Test registration with duplicate username."""
-        # Create a test user first
-        session = TestSessionLocal()
-        test_user = User(
-            email="test@example.com",
-            username="testuser",
-            hashed_password=get_password_hash("testpassword"),
-            full_name="Test User",
-            is_active=True,
-        )
-        session.add(test_user)
-        session.commit()
-        session.refresh(test_user)
-        test_username = test_user.username  # Get the username before closing session
-        session.close()
-
+    @pytest.mark.parametrize(
+        "user_data, detail",
+        [
+            (
+                {"email": "test@example.com", "username": "differentuser"},
+                "Email already registered",
+            ),
+            (
+                {"email": "different@example.com", "username": "testuser"},
+                "Username already taken",
+            ),
+        ],
+        ids=["duplicate_email", "duplicate_username"],
+    )
+    def test_register_user_duplicate(self, client, test_user, user_data, detail):
+        """Test registration with an email or username that is already taken."""
         user_data = {
-            "email": "different@example.com",
-            "username": test_username,
+            **user_data,
             "password": "password123",
             "full_name": "Different User",
         }
@@ -125,9 +56,9 @@ class TestAuthEndpoints:
         response = client.post("/api/v1/auth/register", json=user_data)
 
         assert response.status_code == status.HTTP_400_BAD_REQUEST
-        assert "Username already taken" in response.json()["detail"]
+        assert detail in response.json()["detail"]
 
-    def test_register_user_invalid_data(self):
+    def test_register_user_invalid_data(self, app_client):
         """Test registration with invalid data."""
         user_data = {
             "email": "invalid-email",
@@ -135,29 +66,14 @@ class TestAuthEndpoints:
             "password": "123",  # Too short
         }
 
-        response = client.post("/api/v1/auth/register", json=user_data)
+        response = app_client.post("/api/v1/auth/register", json=user_data)
 
         assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
 
-    def test_login_success(self):
+    def test_login_success(self, client, test_user):
         """Test successful login."""
-        # Create a test user first
-        session = TestSessionLocal()
-        test_user = User(
-            email="test@example.com",
-            username="testuser",
-            hashed_password=get_password_hash("testpassword"),
-            full_name="Test User",
-            is_active=True,
-        )
-        session.add(test_user)
-        session.commit()
-        session.refresh(test_user)
-        test_username = test_user.username  # Get the username before closing session
-        session.close()
-
         login_data = {
-            "username": test_username,
+            "username": test_user.username,
             "password": "testpassword",
         }
 
@@ -169,7 +85,7 @@ class TestAuthEndpoints:
         assert data["token_type"] == "bearer"
         assert len(data["access_token"]) > 0
 
-    def test_login_invalid_username(self):
+    def test_login_invalid_username(self, client):
         """Test login with invalid username."""
         login_data = {
             "username": "nonexistent",
@@ -181,25 +97,10 @@ class TestAuthEndpoints:
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
         assert "Incorrect username or password" in response.json()["detail"]
 
-    def test_login_invalid_password(self):
+    def test_login_invalid_password(self, client, test_user):
         """Test login with invalid password."""
-        # Create a test user first
-        session = TestSessionLocal()
-        test_user = User(
-            email="test@example.com",
-            username="testuser",
-            hashed_password=get_password_hash("testpassword"),
-            full_name="Test User",
-            is_active=True,
-        )
-        session.add(test_user)
-        session.commit()
-        session.refresh(test_user)
-        test_username = test_user.username  # Get the username before closing session
-        session.close()
-
         login_data = {
-            "username": test_username,
+            "username": test_user.username,
             "password": "wrongpassword",
         }
 
@@ -208,34 +109,22 @@ class TestAuthEndpoints:
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
         assert "Incorrect username or password" in response.json()["detail"]
 
-    def test_get_current_user_success(self):
-        """Test getting current user with valid token."""
-        # Create a test user first
-        session = TestSessionLocal()
-        test_user = User(
-            email="test@example.com",
-            username="testuser",
-            hashed_password=get_password_hash("testpassword"),
-            full_name="Test User",
-            is_active=True,
-        )
-        session.add(test_user)
-        session.commit()
-        session.refresh(test_user)
-        test_username = test_user.username  # Get the username before closing session
-        session.close()
-
-        # Login to get token
-        login_data = {
-            "username": test_username,
-            "password": "testpassword",
-        }
-        login_response = client.post("/api/v1/auth/token", data=login_data)
-        token = login_response.json()["access_token"]
+    def test_login_password_hashing_busy(self, client, test_user):
+        """Test that login asks the client to retry when hashing is saturated."""
+        login_data = {"username": test_user.username, "password": "testpassword"}
 
-        # Use token to access protected endpoint
-        headers = {"Authorization": f"Bearer {token}"}
-        response = client.get("/api/v1/auth/me", headers=headers)
+        with patch("app.auth._password_hash_slots", threading.Semaphore(0)), patch(
+            "app.auth.PASSWORD_HASH_WAIT_SECONDS", 0
+        ):
+            response = client.post("/api/v1/auth/token", data=login_data)
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.headers["retry-after"] == "1"
+
+    def test_get_current_user_success(self, client, auth_headers):
+        """Test getting current user with valid token."""
+        # The token is signed in-process; login is covered by the tests above
+        response = client.get("/api/v1/auth/me", headers=auth_headers)
 
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
@@ -243,20 +132,21 @@ class TestAuthEndpoints:
         assert data["email"] == "test@example.com"
         assert "password" not in data
 
-    def test_get_current_user_invalid_token(self):
+    def test_get_current_user_invalid_token(self, app_client):
         """Test getting current user with invalid token."""
         headers = {"Authorization": "Bearer invalid_token"}
-        response = client.get("/api/v1/auth/me", headers=headers)
+        response = app_client.get("/api/v1/auth/me", headers=headers)
 
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
-    def test_get_current_user_no_token(self):
+    def test_get_current_user_no_token(self, app_client):
         """Test getting current user without token."""
-        response = client.get("/api/v1/auth/me")
+        response = app_client.get("/api/v1/auth/me")
 
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
-    def test_token_lifecycle(self):
+    @pytest.mark.e2e
+    def test_token_lifecycle(self, client):
         """Test complete token lifecycle."""
         # 1. Register user
         user_data = {
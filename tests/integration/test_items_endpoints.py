@@ -2,92 +2,42 @@
 Integration tests for items endpoints.
 """
 
+import pytest
 from fastapi import status
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
 
-from app.auth import get_password_hash
-from app.database import get_db
-from app.main import app
-from app.models import Base, Item, User
-
-# Create a test database for these tests
-test_engine = create_engine(
-    "sqlite:///./test_integration_items.db",
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
-TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
-
-
-def override_get_db():
-    """Override database dependency for testing."""
-    try:
-        db = TestSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-
-# Override the database dependency
-app.dependency_overrides[get_db] = override_get_db
-
-# Create test client
-client = TestClient(app)
+from app.models import Item
 
 
 class TestItemsEndpoints:
     """Test items endpoints integration."""
 
-    def setup_method(self):
-        """Set up test database before each test."""
-        # Create all tables using the test engine
-        Base.metadata.create_all(bind=test_engine)
-
-    def teardown_method(self):
-        """Clean up test database after each test."""
-        Base.metadata.drop_all(bind=test_engine)
-
-    def create_test_user_and_token(self):
-        """Helper method to create a test user and get authentication token."""
-        # Create a test user
-        session = TestSessionLocal()
-        test_user = User(
-            email="test@example.com",
-            username="testuser",
-            hashed_password=get_password_hash("testpassword"),
-            full_name="Test User",
-            is_active=True,
-        )
-        session.add(test_user)
-        session.commit()
-        session.refresh(test_user)
-        session.close()
-
-        # Login to get token
-        login_data = {
-            "username": test_user.username,
-            "password": "testpassword",
-        }
-        login_response = client.post("/api/v1/auth/token", data=login_data)
-        token = login_response.json()["access_token"]
-        headers = {"Authorization": f"Bearer {token}"}
+    @pytest.mark.parametrize(
+        "method, path, json",
+        [
+            ("post", "/api/v1/items/", {"title": "Test Item", "price": 100}),
+            ("get", "/api/v1/items/", None),
+            ("get", "/api/v1/items/1", None),
+            ("put", "/api/v1/items/1", {"title": "Updated Title"}),
+            ("delete", "/api/v1/items/1", None),
+            ("get", "/api/v1/items/my-items", None),
+        ],
+    )
+    def test_requires_authentication(self, app_client, method, path, json):
+        """Test that items endpoints reject unauthenticated requests."""
+        # Rejected before any query runs, so no database session is needed
+        response = app_client.request(method, path, json=json)
 
-        return test_user, headers
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
-    def test_create_item_success(self):
+    def test_create_item_success(self, client, test_user, auth_headers):
         """Test successful item creation."""
-        test_user, headers = self.create_test_user_and_token()
-
         item_data = {
             "title": "Test Item",
             "description": "Test Description",
             "price": 100,
         }
 
-        response = client.post("/api/v1/items/", json=item_data, headers=headers)
+        response = client.post("/api/v1/items/", json=item_data, headers=auth_headers)
 
         assert response.status_code == status.HTTP_201_CREATED
         data = response.json()
@@ -97,54 +47,23 @@ class TestItemsEndpoints:
         assert data["owner_id"] == test_user.id
         assert data["id"] is not None
 
-    def test_create_item_unauthorized(self):
-        """Test item creation without authentication."""
-        item_data = {
-            "title": "Test Item",
-            "description": "Test Description",
-            "price": 100,
-        }
-
-        response = client.post("/api/v1/items/", json=item_data)
-
-        assert response.status_code == status.HTTP_401_UNAUTHORIZED
-
-    def test_create_item_invalid_data(self):
+    def test_create_item_invalid_data(self, client, auth_headers):
         """Test item creation with invalid data."""
-        test_user, headers = self.create_test_user_and_token()
-
         item_data = {
             "title": "",  # Empty title
             "price": -10,  # Negative price
         }
 
-        response = client.post("/api/v1/items/", json=item_data, headers=headers)
+        response = client.post("/api/v1/items/", json=item_data, headers=auth_headers)
 
         assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
 
-    def test_get_items_success(self):
+    def test_get_items_success(self, client, make_items, auth_headers):
         """Test getting items list."""
-        test_user, headers = self.create_test_user_and_token()
-
-        # Create some test items
-        session = TestSessionLocal()
-        item1 = Item(
-            title="Item 1",
-            description="Description 1",
-            price=100,
-            owner_id=test_user.id,
-        )
-        item2 = Item(
-            title="Item 2",
-            description="Description 2",
-            price=200,
-            owner_id=test_user.id,
-        )
-        session.add_all([item1, item2])
-        session.commit()
-        session.close()
+        # Create test items
+        make_items(2)
 
-        response = client.get("/api/v1/items/", headers=headers)
+        response = client.get("/api/v1/items/", headers=auth_headers)
 
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
@@ -157,30 +76,48 @@ class TestItemsEndpoints:
         assert "Item 1" in item_titles
         assert "Item 2" in item_titles
 
-    def test_get_items_unauthorized(self):
-        """Test getting items without authentication."""
-        response = client.get("/api/v1/items/")
+    def test_get_items_cursor_pagination(self, client, make_items, auth_headers):
+        """Test paging through items with the next cursor."""
+        make_items(3)
 
-        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        response = client.get("/api/v1/items/?limit=2", headers=auth_headers)
+        data = response.json()
+        assert [item["title"] for item in data["items"]] == ["Item 1", "Item 2"]
+        assert data["has_more"] is True
+        assert data["next_cursor"] == data["items"][-1]["id"]
+
+        response = client.get(
+            f"/api/v1/items/?limit=2&after_id={data['next_cursor']}"
+            "&include_total=true",
+            headers=auth_headers,
+        )
+        data = response.json()
+        assert [item["title"] for item in data["items"]] == ["Item 3"]
+        assert data["total"] == 3
+        assert data["has_more"] is False
+        assert data["next_cursor"] is None
 
-    def test_get_item_by_id_success(self):
-        """Test getting item by ID."""
-        test_user, headers = self.create_test_user_and_token()
+        # By default the count is skipped, leaving total and pages unset
+        response = client.get("/api/v1/items/?limit=2", headers=auth_headers)
+        data = response.json()
+        assert len(data["items"]) == 2
+        assert data["total"] is None
+        assert data["pages"] is None
+        assert data["has_more"] is True
 
+    def test_get_item_by_id_success(self, client, db_session, test_user, auth_headers):
+        """Test getting item by ID."""
         # Create a test item
-        session = TestSessionLocal()
         test_item = Item(
             title="Test Item",
             description="Test Description",
             price=100,
             owner_id=test_user.id,
         )
-        session.add(test_item)
-        session.commit()
-        session.refresh(test_item)
-        session.close()
+        db_session.add(test_item)
+        db_session.flush()
 
-        response = client.get(f"/api/v1/items/{test_item.id}", headers=headers)
+        response = client.get(f"/api/v1/items/{test_item.id}", headers=auth_headers)
 
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
@@ -188,36 +125,71 @@ class TestItemsEndpoints:
         assert data["description"] == test_item.description
         assert data["price"] == test_item.price
 
-    def test_get_item_by_id_not_found(self):
-        """Test getting non-existent item."""
-        test_user, headers = self.create_test_user_and_token()
+    def test_get_item_by_id_not_modified(
+        self, client, db_session, test_user, auth_headers
+    ):
+        """Test revalidating an item with its ETag."""
+        test_item = Item(title="Test Item", price=100, owner_id=test_user.id)
+        db_session.add(test_item)
+        db_session.flush()
+
+        response = client.get(f"/api/v1/items/{test_item.id}", headers=auth_headers)
+        etag = response.headers["etag"]
+        assert etag.startswith("W/")
+        assert "must-revalidate" in response.headers["cache-control"]
+
+        response = client.get(
+            f"/api/v1/items/{test_item.id}",
+            headers={**auth_headers, "If-None-Match": etag},
+        )
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.headers["etag"] == etag
+        assert response.content == b""
 
-        response = client.get("/api/v1/items/999", headers=headers)
+        response = client.get(
+            f"/api/v1/items/{test_item.id}",
+            headers={**auth_headers, "If-None-Match": 'W/"stale"'},
+        )
+        assert response.status_code == status.HTTP_200_OK
 
-        assert response.status_code == status.HTTP_404_NOT_FOUND
+    def test_get_item_by_id_modified_within_a_second(
+        self, client, test_item, auth_headers
+    ):
+        """Test that an update invalidates the ETag even within the same second."""
+        url = f"/api/v1/items/{test_item.id}"
+        etag = client.get(url, headers=auth_headers).headers["etag"]
+
+        response = client.put(url, json={"title": "Renamed"}, headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
 
-    def test_get_item_by_id_unauthorized(self):
-        """Test getting item without authentication."""
-        response = client.get("/api/v1/items/1")
+        response = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["etag"] != etag
+        assert response.json()["title"] == "Renamed"
+
+    @pytest.mark.parametrize(
+        "method, json",
+        [("get", None), ("put", {"title": "Updated Title"}), ("delete", None)],
+    )
+    def test_item_not_found(self, client, auth_headers, method, json):
+        """Test reading, updating or deleting a non-existent item."""
+        response = client.request(
+            method, "/api/v1/items/999", json=json, headers=auth_headers
+        )
 
-        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response.status_code == status.HTTP_404_NOT_FOUND
 
-    def test_update_item_success(self):
+    def test_update_item_success(self, client, db_session, test_user, auth_headers):
         """Test successful item update."""
-        test_user, headers = self.create_test_user_and_token()
-
         # Create a test item
-        session = TestSessionLocal()
         test_item = Item(
             title="Original Title",
             description="Original Description",
             price=100,
             owner_id=test_user.id,
         )
-        session.add(test_item)
-        session.commit()
-        session.refresh(test_item)
-        session.close()
+        db_session.add(test_item)
+        db_session.flush()
 
         update_data = {
             "title": "Updated Title",
@@ -225,7 +197,7 @@ class TestItemsEndpoints:
         }
 
         response = client.put(
-            f"/api/v1/items/{test_item.id}", json=update_data, headers=headers
+            f"/api/v1/items/{test_item.id}", json=update_data, headers=auth_headers
         )
 
         assert response.status_code == status.HTTP_200_OK
@@ -234,87 +206,37 @@ class TestItemsEndpoints:
         assert data["price"] == 200
         assert data["description"] == "Original Description"  # Unchanged
 
-    def test_update_item_not_found(self):
-        """Test updating non-existent item."""
-        test_user, headers = self.create_test_user_and_token()
-
-        update_data = {"title": "Updated Title"}
-
-        response = client.put("/api/v1/items/999", json=update_data, headers=headers)
-
-        assert response.status_code == status.HTTP_404_NOT_FOUND
-
-    def test_update_item_unauthorized(self):
-        """Test updating item without authentication."""
-        update_data = {"title": "Updated Title"}
-
-        response = client.put("/api/v1/items/1", json=update_data)
+    def test_update_item_forbidden(self, client, other_item, auth_headers):
+        """Test updating another user's item."""
+        response = client.put(
+            f"/api/v1/items/{other_item.id}", json={"price": 200}, headers=auth_headers
+        )
 
-        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response.status_code == status.HTTP_403_FORBIDDEN
 
-    def test_delete_item_success(self):
+    def test_delete_item_success(self, client, db_session, test_item, auth_headers):
         """Test successful item deletion."""
-        test_user, headers = self.create_test_user_and_token()
-
-        # Create a test item
-        session = TestSessionLocal()
-        test_item = Item(
-            title="Test Item",
-            description="Test Description",
-            price=100,
-            owner_id=test_user.id,
-        )
-        session.add(test_item)
-        session.commit()
-        session.refresh(test_item)
-        session.close()
+        item_id = test_item.id
 
-        response = client.delete(f"/api/v1/items/{test_item.id}", headers=headers)
+        response = client.delete(f"/api/v1/items/{item_id}", headers=auth_headers)
 
         assert response.status_code == status.HTTP_204_NO_CONTENT
+        # Check the row directly; the not-found responses are tested separately
+        assert db_session.get(Item, item_id) is None
 
-        # Verify item is deleted
-        get_response = client.get(f"/api/v1/items/{test_item.id}", headers=headers)
-        assert get_response.status_code == status.HTTP_404_NOT_FOUND
-
-    def test_delete_item_not_found(self):
-        """Test deleting non-existent item."""
-        test_user, headers = self.create_test_user_and_token()
+    def test_delete_item_forbidden(self, client, other_item, auth_headers):
+        """Test deleting another user's item."""
+        response = client.delete(f"/api/v1/items/{other_item.id}", headers=auth_headers)
 
-        response = client.delete("/api/v1/items/999", headers=headers)
-
-        assert response.status_code == status.HTTP_404_NOT_FOUND
-
-    def test_delete_item_unauthorized(self):
-        """Test deleting item without authentication."""
-        response = client.delete("/api/v1/items/1")
-
-        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response.status_code == status.HTTP_403_FORBIDDEN
 
-    def test_get_my_items_success(self):
+    def test_get_my_items_success(self, client, make_items, auth_headers):
         """Test getting current user's items."""
-        test_user, headers = self.create_test_user_and_token()
-
         # Create items for the test user
-        session = TestSessionLocal()
-        item1 = Item(
-            title="My Item 1",
-            description="Description 1",
-            price=100,
-            owner_id=test_user.id,
-        )
-        item2 = Item(
-            title="My Item 2",
-            description="Description 2",
-            price=200,
-            owner_id=test_user.id,
-        )
-        session.add_all([item1, item2])
-        session.commit()
-        session.close()
+        make_items(2, title="My Item")
 
         # Try the correct endpoint path
-        response = client.get("/api/v1/items/my-items", headers=headers)
+        response = client.get("/api/v1/items/my-items", headers=auth_headers)
 
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
@@ -323,9 +245,3 @@ class TestItemsEndpoints:
         item_titles = [item["title"] for item in data]
         assert "My Item 1" in item_titles
         assert "My Item 2" in item_titles
-
-    def test_get_my_items_unauthorized(self):
-        """Test getting current user's items without authentication."""
-        response = client.get("/api/v1/items/my-items")
-
-        assert response.status_code == status.HTTP_401_UNAUTHORIZED
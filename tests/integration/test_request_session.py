@@ -0,0 +1,43 @@
+"""
+Integration tests for the request-scoped database session.
+"""
+
+import asyncio
+from unittest.mock import patch
+
+from fastapi import status
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+
+
+class TestRequestSession:
+    """Test the session shared by a request through DBSessionMiddleware."""
+
+    def test_request_uses_one_session_closed_off_loop(self, app_client, db_engine):
+        """Test that a request gets one session, closed outside the event loop."""
+        sessions = []
+        closed_on_loop = []
+
+        class RecordingSession(Session):
+            def close(self):
+                try:
+                    asyncio.get_running_loop()
+                    closed_on_loop.append(True)
+                except RuntimeError:
+                    closed_on_loop.append(False)
+                super().close()
+
+        def create_session():
+            session = RecordingSession(bind=db_engine)
+            sessions.append(session)
+            return session
+
+        # No get_db override: the app's own scoped session serves the request
+        with patch.object(SessionLocal.registry, "createfunc", create_session):
+            response = app_client.get("/public/items")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(sessions) == 1
+        assert closed_on_loop == [False]
+        assert SessionLocal.registry.registry == {}
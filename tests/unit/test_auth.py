@@ -2,17 +2,17 @@
 Unit tests for authentication module.
 """
 
+import threading
+import time
 from datetime import timedelta
 from unittest.mock import patch
 
 import pytest
 from fastapi import HTTPException, status
 from jose import jwt
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
 
 from app.auth import (
+    PasswordHashingBusy,
     authenticate_user,
     create_access_token,
     get_current_active_user,
@@ -22,19 +22,15 @@ from app.auth import (
     get_current_user_optional,
     get_password_hash,
     get_user,
+    pwd_context,
     verify_password,
     verify_token,
 )
 from app.config import settings
-from app.models import Base, User
+from app.models import User
 
-# Create a test database for these tests
-test_engine = create_engine(
-    "sqlite:///./test_auth.db",
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
-TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+# Seeded users share precomputed hashes instead of hashing per test
+PASSWORD_HASH = get_password_hash("password")
 
 
 class TestPasswordHashing:
@@ -58,18 +54,26 @@ class TestPasswordHashing:
         hash2 = get_password_hash(password2)
 
         assert hash1 != hash2
+        # Salting alone makes the hashes differ; each must only match its own
+        assert not verify_password(password1, hash2)
+        assert not verify_password(password2, hash1)
+
+    def test_password_hashing_saturated(self):
+        """Test that hashing is rejected when no slot is free."""
+        with patch("app.auth._password_hash_slots", threading.Semaphore(0)), patch(
+            "app.auth.PASSWORD_HASH_WAIT_SECONDS", 0
+        ):
+            with pytest.raises(PasswordHashingBusy):
+                get_password_hash("testpassword")
 
 
 class TestTokenCreation:
     """Test JWT token creation and verification."""
 
-    def test_create_access_token(self):
+    def test_create_access_token(self, user_token):
         """Test creating access token."""
-        data = {"sub": "testuser"}
-        token = create_access_token(data)
-
-        assert isinstance(token, str)
-        assert len(token) > 0
+        assert isinstance(user_token, str)
+        assert len(user_token) > 0
 
     def test_create_access_token_with_expiry(self):
         """Test creating access token with custom expiry."""
@@ -82,15 +86,24 @@ class TestTokenCreation:
             token, settings.secret_key, algorithms=[settings.algorithm]
         )
         assert payload["sub"] == "testuser"
+        assert isinstance(payload["exp"], int)
+        assert 0 < payload["exp"] - time.time() <= 15 * 60
 
-    def test_verify_token_valid(self):
+    def test_verify_token_valid(self, user_token):
         """Test verifying valid token."""
-        data = {"sub": "testuser"}
-        token = create_access_token(data)
-        username = verify_token(token)
+        username = verify_token(user_token)
 
         assert username == "testuser"
 
+    def test_verify_token_cached(self):
+        """Test that a verified token is not decoded again."""
+        token = create_access_token({"sub": "cacheduser"})
+        assert verify_token(token) == "cacheduser"
+
+        with patch("app.auth.jwt.decode") as mock_decode:
+            assert verify_token(token) == "cacheduser"
+            mock_decode.assert_not_called()
+
     def test_verify_token_invalid(self):
         """Test verifying invalid token."""
         username = verify_token("invalid_token")
@@ -118,472 +131,237 @@ class TestTokenCreation:
 
         assert username is None
 
+    def test_verify_token_missing_exp(self):
+        """Test that tokens without an expiry are rejected."""
+        token = jwt.encode(
+            {"sub": "testuser"}, settings.secret_key, algorithm=settings.algorithm
+        )
+        username = verify_token(token)
+
+        assert username is None
+
 
 class TestUserAuthentication:
     """Test user authentication functionality."""
 
-    def test_authenticate_user_valid(self):
+    def test_authenticate_user_valid(self, db_session, test_user):
         """Test authenticating a valid user."""
-        # Create test database and user
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            # Create a test user
-            test_user = User(
-                email="test@example.com",
-                username="testuser",
-                hashed_password=get_password_hash("testpassword"),
-                full_name="Test User",
-                is_active=True,
-            )
-            session.add(test_user)
-            session.commit()
-            session.refresh(test_user)
-
-            # Test authentication
-            user = authenticate_user(session, "testuser", "testpassword")
-            assert user is not None
-            assert user.username == "testuser"
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
+        # Test authentication
+        user = authenticate_user(db_session, "testuser", "testpassword")
+        assert user is not None
+        assert user.username == "testuser"
+
+    def test_authenticate_user_upgrades_bcrypt_hash(self, db_session):
+        """Test that a legacy bcrypt hash is replaced on successful login."""
+        test_user = User(
+            email="test@example.com",
+            username="testuser",
+            hashed_password=pwd_context.hash("testpassword", scheme="bcrypt"),
+            is_active=True,
+        )
+        db_session.add(test_user)
+        db_session.commit()
+
+        user = authenticate_user(db_session, "testuser", "testpassword")
+        assert user is not None
+        assert user.hashed_password.startswith("$argon2id$")
+        assert verify_password("testpassword", user.hashed_password)
 
-    def test_authenticate_user_invalid_username(self):
+    def test_authenticate_user_invalid_username(self, db_session):
         """Test authenticating with invalid username."""
-        # Create test database
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            user = authenticate_user(session, "nonexistent", "password")
-            assert user is None
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    def test_authenticate_user_invalid_password(self):
+        user = authenticate_user(db_session, "nonexistent", "password")
+        assert user is None
+
+    def test_authenticate_user_invalid_password(self, db_session, test_user):
         """Test authenticating with invalid password."""
-        # Create test database and user
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            # Create a test user
-            test_user = User(
-                email="test@example.com",
-                username="testuser",
-                hashed_password=get_password_hash("testpassword"),
-                full_name="Test User",
-                is_active=True,
-            )
-            session.add(test_user)
-            session.commit()
-
-            # Test authentication with wrong password
-            user = authenticate_user(session, "testuser", "wrongpassword")
-            assert user is None
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    def test_authenticate_user_inactive(self):
+        # Test authentication with wrong password
+        user = authenticate_user(db_session, "testuser", "wrongpassword")
+        assert user is None
+
+    def test_authenticate_user_inactive(self, db_session):
         """Test authenticating an inactive user."""
-        # Create test database and inactive user
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            # Create an inactive user
-            inactive_user = User(
-                email="inactive@example.com",
-                username="inactive",
-                hashed_password=get_password_hash("password"),
-                full_name="Inactive User",
-                is_active=False,
-            )
-            session.add(inactive_user)
-            session.commit()
-
-            # Test authentication - the function doesn't check is_active, so it
-            # should return the user
-            user = authenticate_user(session, "inactive", "password")
-            assert user is not None
-            assert not user.is_active
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
+        # Create an inactive user
+        inactive_user = User(
+            email="inactive@example.com",
+            username="inactive",
+            hashed_password=PASSWORD_HASH,
+            full_name="Inactive User",
+            is_active=False,
+        )
+        db_session.add(inactive_user)
+        db_session.commit()
+
+        # Test authentication - the function doesn't check is_active, so it
+        # should return the user
+        user = authenticate_user(db_session, "inactive", "password")
+        assert user is not None
+        assert not user.is_active
 
 
 class TestUserFunctions:
     """Test user-related functions."""
 
-    def test_get_user_valid(self):
+    def test_get_user_valid(self, db_session, test_user):
         """Test getting a valid user."""
-        # Create test database and user
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            # Create a test user
-            test_user = User(
-                email="test@example.com",
-                username="testuser",
-                hashed_password=get_password_hash("testpassword"),
-                full_name="Test User",
-                is_active=True,
-            )
-            session.add(test_user)
-            session.commit()
-            session.refresh(test_user)
-
-            # Test getting user by username (not id)
-            user = get_user(session, "testuser")
-            assert user is not None
-            assert user.username == "testuser"
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
+        # Test getting user by username (not id)
+        user = get_user(db_session, "testuser")
+        assert user is not None
+        assert user.username == "testuser"
 
-    def test_get_user_invalid(self):
+    def test_get_user_invalid(self, db_session):
         """Test getting a non-existent user."""
-        # Create test database
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            user = get_user(session, 999)
-            assert user is None
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
+        user = get_user(db_session, 999)
+        assert user is None
 
 
 class TestCurrentUserDependencies:
     """Test current user dependency functions."""
 
-    @pytest.mark.asyncio
-    async def test_get_current_user_valid_token(self):
+    def test_get_current_user_valid_token(self, db_session, test_user, user_token):
         """Test getting current user with valid token."""
-        # Create test database and user
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            # Create a test user
-            test_user = User(
-                email="test@example.com",
-                username="testuser",
-                hashed_password=get_password_hash("testpassword"),
-                full_name="Test User",
-                is_active=True,
-            )
-            session.add(test_user)
-            session.commit()
-            session.refresh(test_user)
-
-            # Create valid token
-            token = create_access_token({"sub": test_user.username})
-
-            # Mock the dependency
-            with patch("app.auth.oauth2_scheme", return_value=token):
-                with patch("app.auth.get_db", return_value=session):
-                    user = await get_current_user(token=token, db=session)
-                    assert user is not None
-                    assert user.username == test_user.username
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
+        # Mock the dependency
+        with patch("app.auth.oauth2_scheme", return_value=user_token):
+            with patch("app.auth.get_db", return_value=db_session):
+                user = get_current_user(token=user_token, db=db_session)
+                assert user is not None
+                assert user.username == test_user.username
 
-    @pytest.mark.asyncio
-    async def test_get_current_user_no_token(self):
+    def test_get_current_user_no_token(self, db_session):
         """Test getting current user with no token."""
-        # Create test database
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
+        with pytest.raises(HTTPException) as exc_info:
+            get_current_user(token=None, db=db_session)
 
-        try:
-            with pytest.raises(HTTPException) as exc_info:
-                await get_current_user(token=None, db=session)
+        assert exc_info.value.status_code == status.HTTP_401_UNAUTHORIZED
 
-            assert exc_info.value.status_code == status.HTTP_401_UNAUTHORIZED
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    @pytest.mark.asyncio
-    async def test_get_current_user_invalid_token(self):
+    def test_get_current_user_invalid_token(self, db_session):
         """Test getting current user with invalid token."""
-        # Create test database
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
+        with pytest.raises(HTTPException) as exc_info:
+            get_current_user(token="invalid_token", db=db_session)
 
-        try:
-            with pytest.raises(HTTPException) as exc_info:
-                await get_current_user(token="invalid_token", db=session)
+        assert exc_info.value.status_code == status.HTTP_401_UNAUTHORIZED
 
-            assert exc_info.value.status_code == status.HTTP_401_UNAUTHORIZED
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    @pytest.mark.asyncio
-    async def test_get_current_user_user_not_found(self):
+    def test_get_current_user_user_not_found(self, db_session):
         """Test getting current user when user doesn't exist in database."""
-        # Create test database
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
+        # Create token for non-existent user
+        token = create_access_token({"sub": "nonexistent"})
 
-        try:
-            # Create token for non-existent user
-            token = create_access_token({"sub": "nonexistent"})
+        with pytest.raises(HTTPException) as exc_info:
+            get_current_user(token=token, db=db_session)
 
-            with pytest.raises(HTTPException) as exc_info:
-                await get_current_user(token=token, db=session)
+        assert exc_info.value.status_code == status.HTTP_401_UNAUTHORIZED
 
-            assert exc_info.value.status_code == status.HTTP_401_UNAUTHORIZED
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
+    def test_get_current_user_cached(self, db_session, test_user, user_token):
+        """Test that repeat lookups for the same user skip the database."""
+        get_current_user(token=user_token, db=db_session)
+
+        with patch("app.auth.get_user") as mock_get_user:
+            user = get_current_user(token=user_token, db=db_session)
+            mock_get_user.assert_not_called()
+
+        assert user.id == test_user.id
+        assert user.username == "testuser"
 
     @pytest.mark.asyncio
-    async def test_get_current_active_user_valid(self):
+    async def test_get_current_active_user_valid(self, test_user):
         """Test getting current active user."""
-        # Create test database and user
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            # Create a test user
-            test_user = User(
-                email="test@example.com",
-                username="testuser",
-                hashed_password=get_password_hash("testpassword"),
-                full_name="Test User",
-                is_active=True,
-            )
-            session.add(test_user)
-            session.commit()
-            session.refresh(test_user)
-
-            # Mock get_current_user to return active user
-            with patch("app.auth.get_current_user", return_value=test_user):
-                user = await get_current_active_user(current_user=test_user)
-                assert user is not None
-                assert user.is_active
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
+        # Mock get_current_user to return active user
+        with patch("app.auth.get_current_user", return_value=test_user):
+            user = await get_current_active_user(current_user=test_user)
+            assert user is not None
+            assert user.is_active
 
     @pytest.mark.asyncio
     async def test_get_current_active_user_inactive(self):
         """Test getting current active user when user is inactive."""
-        # Create test database
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            # Create inactive user
-            inactive_user = User(
-                email="inactive@example.com",
-                username="inactive",
-                hashed_password=get_password_hash("password"),
-                is_active=False,
-            )
-
-            with pytest.raises(HTTPException) as exc_info:
-                await get_current_active_user(current_user=inactive_user)
-
-            assert exc_info.value.status_code == 400
-            assert "Inactive user" in str(exc_info.value.detail)
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
+        # Create inactive user
+        inactive_user = User(
+            email="inactive@example.com",
+            username="inactive",
+            hashed_password=PASSWORD_HASH,
+            is_active=False,
+        )
+
+        with pytest.raises(HTTPException) as exc_info:
+            await get_current_active_user(current_user=inactive_user)
+
+        assert exc_info.value.status_code == 400
+        assert "Inactive user" in str(exc_info.value.detail)
 
     @pytest.mark.asyncio
     async def test_get_current_superuser_valid(self):
         """Test getting current superuser."""
-        # Create test database
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            # Create superuser
-            superuser = User(
-                email="admin@example.com",
-                username="admin",
-                hashed_password=get_password_hash("hashed"),
-                is_superuser=True,
-            )
-
-            with patch("app.auth.get_current_user", return_value=superuser):
-                user = await get_current_superuser(current_user=superuser)
-                assert user is not None
-                assert user.is_superuser
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
+        # Create superuser
+        superuser = User(
+            email="admin@example.com",
+            username="admin",
+            hashed_password=PASSWORD_HASH,
+            is_superuser=True,
+        )
+
+        with patch("app.auth.get_current_user", return_value=superuser):
+            user = await get_current_superuser(current_user=superuser)
+            assert user is not None
+            assert user.is_superuser
 
     @pytest.mark.asyncio
-    async def test_get_current_superuser_not_superuser(self):
+    async def test_get_current_superuser_not_superuser(self, test_user):
         """Test getting current superuser when user is not superuser."""
-        # Create test database and user
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            # Create a regular user
-            test_user = User(
-                email="test@example.com",
-                username="testuser",
-                hashed_password=get_password_hash("testpassword"),
-                full_name="Test User",
-                is_active=True,
-            )
-            session.add(test_user)
-            session.commit()
-            session.refresh(test_user)
-
-            with pytest.raises(HTTPException) as exc_info:
-                await get_current_superuser(current_user=test_user)
-
-            assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
-            assert "Not enough permissions" in str(exc_info.value.detail)
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
+        with pytest.raises(HTTPException) as exc_info:
+            await get_current_superuser(current_user=test_user)
+
+        assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
+        assert "Not enough permissions" in str(exc_info.value.detail)
 
 
 class TestOptionalAuthentication:
     """Test optional authentication functions."""
 
-    def test_get_current_user_optional_with_token(self):
+    def test_get_current_user_optional_with_token(
+        self, db_session, test_user, user_token
+    ):
         """Test getting current user optional with valid token."""
-        # Create test database and user
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            # Create a test user
-            test_user = User(
-                email="test@example.com",
-                username="testuser",
-                hashed_password=get_password_hash("testpassword"),
-                full_name="Test User",
-                is_active=True,
-            )
-            session.add(test_user)
-            session.commit()
-            session.refresh(test_user)
-
-            # Create valid token
-            token = create_access_token({"sub": test_user.username})
-
-            # Mock the dependency
-            with patch("app.auth.oauth2_scheme", return_value=token):
-                with patch("app.auth.get_db", return_value=session):
-                    user = get_current_user_optional(token=token, db=session)
-                    assert user is not None
-                    assert user.username == test_user.username
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    def test_get_current_user_optional_with_invalid_token(self):
+        # Mock the dependency
+        with patch("app.auth.oauth2_scheme", return_value=user_token):
+            with patch("app.auth.get_db", return_value=db_session):
+                user = get_current_user_optional(token=user_token, db=db_session)
+                assert user is not None
+                assert user.username == test_user.username
+
+    def test_get_current_user_optional_with_invalid_token(self, db_session):
         """Test getting current user optional with invalid token."""
-        # Create test database
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            user = get_current_user_optional(token="invalid_token", db=session)
-            assert user is None
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    def test_get_current_user_optional_with_credentials(self):
+        user = get_current_user_optional(token="invalid_token", db=db_session)
+        assert user is None
+
+    def test_get_current_user_optional_with_credentials(self, db_session):
         """Test getting current user optional with credentials."""
-        # Create test database
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            user = get_current_user_optional(token="credentials", db=session)
-            assert user is None
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    def test_get_current_user_optional_no_auth(self):
+        user = get_current_user_optional(token="credentials", db=db_session)
+        assert user is None
+
+    def test_get_current_user_optional_no_auth(self, db_session):
         """Test getting current user optional with no authentication."""
-        # Create test database
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            user = get_current_user_optional(token=None, db=session)
-            assert user is None
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    def test_get_current_active_user_optional_with_active_user(self):
+        user = get_current_user_optional(token=None, db=db_session)
+        assert user is None
+
+    def test_get_current_active_user_optional_with_active_user(self, test_user):
         """Test getting current active user optional with active user."""
-        # Create test database and user
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            # Create a test user
-            test_user = User(
-                email="test@example.com",
-                username="testuser",
-                hashed_password=get_password_hash("testpassword"),
-                full_name="Test User",
-                is_active=True,
-            )
-            session.add(test_user)
-            session.commit()
-            session.refresh(test_user)
-
-            user = get_current_active_user_optional(current_user=test_user)
-            assert user is not None
-            assert user.is_active
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
+        user = get_current_active_user_optional(current_user=test_user)
+        assert user is not None
+        assert user.is_active
 
     def test_get_current_active_user_optional_with_inactive_user(self):
         """Test getting current active user optional with inactive user."""
-        # Create test database
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            # Create inactive user
-            inactive_user = User(
-                email="inactive@example.com",
-                username="inactive",
-                hashed_password=get_password_hash("password"),
-                is_active=False,
-            )
-
-            user = get_current_active_user_optional(current_user=inactive_user)
-            assert user is None
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    def test_get_current_active_user_optional_no_user(self):
+        # Create inactive user
+        inactive_user = User(
+            email="inactive@example.com",
+            username="inactive",
+            hashed_password=PASSWORD_HASH,
+            is_active=False,
+        )
+
+        user = get_current_active_user_optional(current_user=inactive_user)
+        assert user is None
+
+    def test_get_current_active_user_optional_no_user(self, db_session):
         """Test getting current active user optional with no user."""
-        # Create test database
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            user = get_current_active_user_optional(current_user=None)
-            assert user is None
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
+        user = get_current_active_user_optional(current_user=None)
+        assert user is None
@@ -0,0 +1,74 @@
+"""
+Unit tests for caching utilities.
+"""
+
+from unittest.mock import patch
+
+from app.cache import TTLCache
+
+
+class TestTTLCache:
+    """Test TTL LRU cache behaviour."""
+
+    def test_set_and_get(self):
+        """Test that cached values are returned."""
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("key", "value")
+
+        assert cache.get("key") == "value"
+        assert cache.get("missing") is None
+
+    def test_entries_expire(self):
+        """Test that entries are dropped once their TTL has elapsed."""
+        cache = TTLCache(maxsize=10, ttl=60)
+        with patch("app.cache.time.monotonic", return_value=1000.0):
+            cache.set("key", "value")
+        with patch("app.cache.time.monotonic", return_value=1061.0):
+            assert cache.get("key") is None
+        assert len(cache) == 0
+
+    def test_per_entry_ttl_is_capped(self):
+        """Test that a per-entry TTL can shorten but not extend the default."""
+        cache = TTLCache(maxsize=10, ttl=60)
+        with patch("app.cache.time.monotonic", return_value=1000.0):
+            cache.set("short", "value", ttl=5)
+            cache.set("long", "value", ttl=600)
+        with patch("app.cache.time.monotonic", return_value=1010.0):
+            assert cache.get("short") is None
+            assert cache.get("long") == "value"
+        with patch("app.cache.time.monotonic", return_value=1061.0):
+            assert cache.get("long") is None
+
+    def test_non_positive_ttl_is_not_cached(self):
+        """Test that already-expired entries are never stored."""
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("key", "value", ttl=-1)
+
+        assert cache.get("key") is None
+        assert len(cache) == 0
+
+    def test_least_recently_used_is_evicted(self):
+        """Test that the cache evicts the least recently used entry when full."""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_pop_and_clear(self):
+        """Test removing entries."""
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        cache.pop("a")
+        cache.pop("missing")
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+
+        cache.clear()
+        assert len(cache) == 0
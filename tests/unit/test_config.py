@@ -0,0 +1,43 @@
+"""
+Unit tests for configuration management.
+"""
+
+from app.config import Settings, get_settings, settings
+
+
+class TestSettings:
+    """Test derived settings."""
+
+    def test_api_keys_parsed_once(self):
+        """Test that API keys are parsed into a cached set."""
+        settings = Settings(api_keys_raw=" key-1, key-2,,")
+
+        assert settings.api_keys == frozenset({"key-1", "key-2"})
+        assert settings.api_keys is settings.api_keys
+
+    def test_api_keys_default_empty(self):
+        """Test that no API keys are configured by default."""
+        assert Settings(api_keys_raw=None).api_keys == frozenset()
+
+    def test_exclude_api_key_paths(self):
+        """Test that exclude paths are parsed into a prefix tuple."""
+        settings = Settings(exclude_api_key_paths_raw="/redoc, /docs")
+
+        assert settings.exclude_api_key_paths == ("/redoc", "/docs")
+        assert "/docs/oauth2-redirect".startswith(settings.exclude_api_key_paths)
+
+    def test_get_settings_cached(self):
+        """Test that settings are only loaded once."""
+        assert get_settings() is get_settings()
+        assert get_settings() is settings
+
+    def test_password_hash_costs_from_env(self, monkeypatch):
+        """Test that password hashing costs can be lowered per environment."""
+        monkeypatch.setenv("BCRYPT_ROUNDS", "4")
+        monkeypatch.setenv("ARGON2_ROUNDS", "1")
+
+        settings = Settings()
+
+        assert settings.bcrypt_rounds == 4
+        assert settings.argon2_rounds == 1
+        assert settings.argon2_memory_cost == 65536
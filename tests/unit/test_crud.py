@@ -2,605 +2,563 @@
 Unit tests for CRUD operations.
 """
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from contextlib import contextmanager
+from unittest.mock import patch
 
+from sqlalchemy import event, insert
+
+from app import schemas
 from app.crud import (
     create_item,
     create_user,
     delete_item,
+    delete_item_if_owner,
     delete_user,
     get_item_by_id,
+    get_item_owner,
     get_items,
     get_items_count,
+    get_items_page,
     get_user_by_email,
     get_user_by_id,
     get_user_by_username,
     update_item,
     update_user,
 )
-from app.models import Base, Item, User
+from app.models import Item, User
 from app.schemas import ItemCreate, ItemUpdate, UserCreate, UserUpdate
 
-# Create a test database for these tests
-test_engine = create_engine(
-    "sqlite:///./test_crud.db",
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
-TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+
+@contextmanager
+def record_statements(engine):
+    """Collect the SQL run inside the block, ignoring savepoint bookkeeping."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not statement.startswith(("SAVEPOINT", "RELEASE", "ROLLBACK")):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
 
 
 class TestUserCRUD:
     """Test user CRUD operations."""
 
-    def test_create_user(self):
+    def test_create_user(self, db_session):
         """Test creating a new user."""
-        # Create test database
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            user_data = UserCreate(
-                email="test@example.com",
-                username="testuser",
-                password="testpassword",
-                full_name="Test User",
-            )
-
-            user = create_user(session, user_data)
-            assert user is not None
-            assert user.email == "test@example.com"
-            assert user.username == "testuser"
-            assert user.full_name == "Test User"
-            assert user.is_active is True
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    def test_get_user_by_id(self):
+        user_data = UserCreate(
+            email="test@example.com",
+            username="testuser",
+            password="testpassword",
+            full_name="Test User",
+        )
+
+        user = create_user(db_session, user_data)
+        assert user is not None
+        assert user.email == "test@example.com"
+        assert user.username == "testuser"
+        assert user.full_name == "Test User"
+        assert user.is_active is True
+
+    def test_get_user_by_id(self, db_session):
         """Test getting user by ID."""
-        # Create test database and user
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            # Create a test user
-            test_user = User(
-                email="test@example.com",
-                username="testuser",
-                hashed_password="hashed_password",
-                full_name="Test User",
-                is_active=True,
-            )
-            session.add(test_user)
-            session.commit()
-            session.refresh(test_user)
-
-            # Test getting user by ID
-            user = get_user_by_id(session, test_user.id)
-            assert user is not None
-            assert user.username == "testuser"
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    def test_get_user_by_id_not_found(self):
+        # Create a test user
+        test_user = User(
+            email="test@example.com",
+            username="testuser",
+            hashed_password="hashed_password",
+            full_name="Test User",
+            is_active=True,
+        )
+        db_session.add(test_user)
+        db_session.commit()
+
+        # Test getting user by ID
+        user = get_user_by_id(db_session, test_user.id)
+        assert user is not None
+        assert user.username == "testuser"
+
+    def test_get_user_by_id_not_found(self, db_session):
         """Test getting user by non-existent ID."""
-        # Create test database
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            user = get_user_by_id(session, 999)
-            assert user is None
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    def test_get_user_by_email(self):
+        user = get_user_by_id(db_session, 999)
+        assert user is None
+
+    def test_get_user_by_email(self, db_session):
         """Test getting user by email."""
-        # Create test database and user
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            # Create a test user
-            test_user = User(
-                email="test@example.com",
-                username="testuser",
-                hashed_password="hashed_password",
-                full_name="Test User",
-                is_active=True,
-            )
-            session.add(test_user)
-            session.commit()
-            session.refresh(test_user)
-
-            # Test getting user by email
-            user = get_user_by_email(session, "test@example.com")
-            assert user is not None
-            assert user.username == "testuser"
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    def test_get_user_by_email_not_found(self):
+        # Create a test user
+        test_user = User(
+            email="test@example.com",
+            username="testuser",
+            hashed_password="hashed_password",
+            full_name="Test User",
+            is_active=True,
+        )
+        db_session.add(test_user)
+        db_session.commit()
+
+        # Test getting user by email
+        user = get_user_by_email(db_session, "test@example.com")
+        assert user is not None
+        assert user.username == "testuser"
+
+    def test_get_user_by_email_not_found(self, db_session):
         """Test getting user by non-existent email."""
-        # Create test database
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            user = get_user_by_email(session, "nonexistent@example.com")
-            assert user is None
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    def test_get_user_by_username(self):
+        user = get_user_by_email(db_session, "nonexistent@example.com")
+        assert user is None
+
+    def test_get_user_by_username(self, db_session):
         """Test getting user by username."""
-        # Create test database and user
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            # Create a test user
-            test_user = User(
-                email="test@example.com",
-                username="testuser",
-                hashed_password="hashed_password",
-                full_name="Test User",
-                is_active=True,
-            )
-            session.add(test_user)
-            session.commit()
-            session.refresh(test_user)
-
-            # Test getting user by username
-            user = get_user_by_username(session, "testuser")
-            assert user is not None
-            assert user.email == "test@example.com"
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    def test_get_user_by_username_not_found(self):
+        # Create a test user
+        test_user = User(
+            email="test@example.com",
+            username="testuser",
+            hashed_password="hashed_password",
+            full_name="Test User",
+            is_active=True,
+        )
+        db_session.add(test_user)
+        db_session.commit()
+
+        # Test getting user by username
+        user = get_user_by_username(db_session, "testuser")
+        assert user is not None
+        assert user.email == "test@example.com"
+
+    def test_get_user_by_username_not_found(self, db_session):
         """Test getting user by non-existent username."""
-        # Create test database
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            user = get_user_by_username(session, "nonexistent")
-            assert user is None
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    def test_update_user(self):
+        user = get_user_by_username(db_session, "nonexistent")
+        assert user is None
+
+    def test_update_user(self, db_session):
         """Test updating a user."""
-        # Create test database and user
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            # Create a test user
-            test_user = User(
-                email="test@example.com",
-                username="testuser",
-                hashed_password="hashed_password",
-                full_name="Test User",
-                is_active=True,
-            )
-            session.add(test_user)
-            session.commit()
-            session.refresh(test_user)
-
-            # Update user data
-            update_data = UserUpdate(
-                full_name="Updated Test User",
-                is_active=False,
+        # Create a test user
+        test_user = User(
+            email="test@example.com",
+            username="testuser",
+            hashed_password="hashed_password",
+            full_name="Test User",
+            is_active=True,
+        )
+        db_session.add(test_user)
+        db_session.commit()
+
+        # Update user data
+        update_data = UserUpdate(
+            full_name="Updated Test User",
+            is_active=False,
+        )
+
+        with patch("app.crud.invalidate_cached_user") as mock_invalidate:
+            updated_user = update_user(db_session, test_user.id, update_data)
+            mock_invalidate.assert_called_once_with("testuser")
+
+        assert updated_user is not None
+        assert updated_user.full_name == "Updated Test User"
+        assert updated_user.is_active is False
+
+    def test_update_user_single_statement(self, db_session, db_engine, test_user):
+        """Test that updating and serializing a user takes one statement."""
+        with record_statements(db_engine) as statements:
+            updated_user = update_user(
+                db_session, test_user.id, UserUpdate(full_name="Renamed")
             )
+            schemas.User.model_validate(updated_user)
 
-            updated_user = update_user(session, test_user.id, update_data)
-            assert updated_user is not None
-            assert updated_user.full_name == "Updated Test User"
-            assert updated_user.is_active is False
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
+        assert len(statements) == 1
+        assert statements[0].startswith("UPDATE")
 
-    def test_update_user_not_found(self):
+    def test_update_user_not_found(self, db_session):
         """Test updating a non-existent user."""
-        # Create test database
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            update_data = UserUpdate(full_name="Updated Test User")
-            updated_user = update_user(session, 999, update_data)
-            assert updated_user is None
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    def test_delete_user(self):
+        update_data = UserUpdate(full_name="Updated Test User")
+        updated_user = update_user(db_session, 999, update_data)
+        assert updated_user is None
+
+    def test_delete_user(self, db_session):
         """Test deleting a user."""
-        # Create test database and user
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            # Create a test user
-            test_user = User(
-                email="test@example.com",
-                username="testuser",
-                hashed_password="hashed_password",
-                full_name="Test User",
-                is_active=True,
-            )
-            session.add(test_user)
-            session.commit()
-            session.refresh(test_user)
-
-            # Delete user
-            success = delete_user(session, test_user.id)
-            assert success is True
-
-            # Verify user is deleted
-            user = get_user_by_id(session, test_user.id)
-            assert user is None
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    def test_delete_user_not_found(self):
+        # Create a test user
+        test_user = User(
+            email="test@example.com",
+            username="testuser",
+            hashed_password="hashed_password",
+            full_name="Test User",
+            is_active=True,
+        )
+        db_session.add(test_user)
+        db_session.commit()
+
+        # Delete user
+        success = delete_user(db_session, test_user.id)
+        assert success is True
+
+        # Verify user is deleted
+        user = get_user_by_id(db_session, test_user.id)
+        assert user is None
+
+    def test_delete_user_not_found(self, db_session):
         """Test deleting a non-existent user."""
-        # Create test database
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            success = delete_user(session, 999)
-            assert success is False
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
+        success = delete_user(db_session, 999)
+        assert success is False
 
 
 class TestItemCRUD:
     """Test item CRUD operations."""
 
-    def test_create_item(self):
+    def test_create_item(self, db_session):
         """Test creating a new item."""
-        # Create test database and user
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            # Create a test user
-            test_user = User(
-                email="test@example.com",
-                username="testuser",
-                hashed_password="hashed_password",
-                full_name="Test User",
-                is_active=True,
-            )
-            session.add(test_user)
-            session.commit()
-            session.refresh(test_user)
-
-            # Create item data
-            item_data = ItemCreate(
-                title="Test Item",
-                description="Test Description",
-                price=100,
-            )
-
-            item = create_item(session, item_data, test_user.id)
-            assert item is not None
-            assert item.title == "Test Item"
-            assert item.description == "Test Description"
-            assert item.price == 100
-            assert item.owner_id == test_user.id
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    def test_get_item_by_id(self):
+        # Create a test user
+        test_user = User(
+            email="test@example.com",
+            username="testuser",
+            hashed_password="hashed_password",
+            full_name="Test User",
+            is_active=True,
+        )
+        db_session.add(test_user)
+        db_session.commit()
+
+        # Create item data
+        item_data = ItemCreate(
+            title="Test Item",
+            description="Test Description",
+            price=100,
+        )
+
+        item = create_item(db_session, item_data, test_user.id)
+        assert item is not None
+        assert item.title == "Test Item"
+        assert item.description == "Test Description"
+        assert item.price == 100
+        assert item.owner_id == test_user.id
+
+    def test_get_item_by_id(self, db_session):
         """Test getting item by ID."""
-        # Create test database, user, and item
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            # Create a test user
-            test_user = User(
-                email="test@example.com",
-                username="testuser",
-                hashed_password="hashed_password",
-                full_name="Test User",
-                is_active=True,
-            )
-            session.add(test_user)
-            session.commit()
-            session.refresh(test_user)
-
-            # Create a test item
-            test_item = Item(
-                title="Test Item",
-                description="Test Description",
-                price=100,
-                owner_id=test_user.id,
-            )
-            session.add(test_item)
-            session.commit()
-            session.refresh(test_item)
-
-            # Test getting item by ID
-            item = get_item_by_id(session, test_item.id)
-            assert item is not None
-            assert item.title == "Test Item"
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    def test_get_item_by_id_not_found(self):
+        # Create a test user
+        test_user = User(
+            email="test@example.com",
+            username="testuser",
+            hashed_password="hashed_password",
+            full_name="Test User",
+            is_active=True,
+        )
+        db_session.add(test_user)
+        db_session.commit()
+
+        # Create a test item
+        test_item = Item(
+            title="Test Item",
+            description="Test Description",
+            price=100,
+            owner_id=test_user.id,
+        )
+        db_session.add(test_item)
+        db_session.commit()
+
+        # Test getting item by ID
+        item = get_item_by_id(db_session, test_item.id)
+        assert item is not None
+        assert item.title == "Test Item"
+
+    def test_get_item_by_id_not_found(self, db_session):
         """Test getting item by non-existent ID."""
-        # Create test database
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-        try:
-            item = get_item_by_id(session, 999)
-            assert item is None
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    def test_update_item(self):
+        item = get_item_by_id(db_session, 999)
+        assert item is None
+
+    def test_update_item(self, db_session):
         """Test updating an item."""
-        # Create test database, user, and item
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-        try:
-            # Create a test user
-            test_user = User(
-                email="test@example.com",
-                username="testuser",
-                hashed_password="hashed_password",
-                full_name="Test User",
-                is_active=True,
-            )
-            session.add(test_user)
-            session.commit()
-            session.refresh(test_user)
-            # Create a test item
-            test_item = Item(
-                title="Test Item",
-                description="Test Description",
-                price=100,
-                owner_id=test_user.id,
-            )
-            session.add(test_item)
-            session.commit()
-            session.refresh(test_item)
-
-            # Update item data
-            update_data = ItemUpdate(
-                title="Updated Test Item",
-                price=200,
+        # Create a test user
+        test_user = User(
+            email="test@example.com",
+            username="testuser",
+            hashed_password="hashed_password",
+            full_name="Test User",
+            is_active=True,
+        )
+        db_session.add(test_user)
+        db_session.commit()
+        # Create a test item
+        test_item = Item(
+            title="Test Item",
+            description="Test Description",
+            price=100,
+            owner_id=test_user.id,
+        )
+        db_session.add(test_item)
+        db_session.commit()
+
+        # Update item data
+        update_data = ItemUpdate(
+            title="Updated Test Item",
+            price=200,
+        )
+
+        updated_item = update_item(db_session, test_item.id, update_data)
+        assert updated_item is not None
+        assert updated_item.title == "Updated Test Item"
+        assert updated_item.price == 200
+
+        # Test that the owner filter is applied to the update
+        not_updated = update_item(
+            db_session, test_item.id, ItemUpdate(price=300), owner_id=999
+        )
+        assert not_updated is None
+        db_session.refresh(test_item)
+        assert test_item.price == 200
+
+    def test_update_item_single_statement(self, db_session, db_engine, test_item):
+        """Test that updating and serializing an owned item takes one statement."""
+        with record_statements(db_engine) as statements:
+            updated_item = update_item(
+                db_session,
+                test_item.id,
+                ItemUpdate(title="Renamed"),
+                owner_id=test_item.owner_id,
             )
+            schemas.Item.model_validate(updated_item)
 
-            updated_item = update_item(session, test_item.id, update_data)
-            assert updated_item is not None
-            assert updated_item.title == "Updated Test Item"
-            assert updated_item.price == 200
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
+        assert len(statements) == 1
+        assert statements[0].startswith("UPDATE")
 
-    def test_update_item_not_found(self):
+    def test_update_item_not_found(self, db_session):
         """Test updating a non-existent item."""
-        # Create test database
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            update_data = ItemUpdate(title="Updated Test Item")
-            updated_item = update_item(session, 999, update_data)
-            assert updated_item is None
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    def test_delete_item(self):
+        update_data = ItemUpdate(title="Updated Test Item")
+        updated_item = update_item(db_session, 999, update_data)
+        assert updated_item is None
+
+    def test_delete_item(self, db_session):
         """Test deleting an item."""
-        # Create test database, user, and item
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            # Create a test user
-            test_user = User(
-                email="test@example.com",
-                username="testuser",
-                hashed_password="hashed_password",
-                full_name="Test User",
-                is_active=True,
-            )
-            session.add(test_user)
-            session.commit()
-            session.refresh(test_user)
-
-            # Create a test item
-            test_item = Item(
-                title="Test Item",
-                description="Test Description",
-                price=100,
-                owner_id=test_user.id,
-            )
-            session.add(test_item)
-            session.commit()
-            session.refresh(test_item)
-
-            # Delete item
-            success = delete_item(session, test_item.id)
-            assert success is True
-
-            # Verify item is deleted
-            item = get_item_by_id(session, test_item.id)
-            assert item is None
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    def test_delete_item_not_found(self):
+        # Create a test user
+        test_user = User(
+            email="test@example.com",
+            username="testuser",
+            hashed_password="hashed_password",
+            full_name="Test User",
+            is_active=True,
+        )
+        db_session.add(test_user)
+        db_session.commit()
+
+        # Create a test item
+        test_item = Item(
+            title="Test Item",
+            description="Test Description",
+            price=100,
+            owner_id=test_user.id,
+        )
+        db_session.add(test_item)
+        db_session.commit()
+
+        # Delete item
+        success = delete_item(db_session, test_item.id)
+        assert success is True
+
+        # Verify item is deleted
+        item = get_item_by_id(db_session, test_item.id)
+        assert item is None
+
+    def test_delete_item_if_owner(self, db_session):
+        """Test deleting an item only when owned by the given user."""
+        test_user = User(
+            email="test@example.com",
+            username="testuser",
+            hashed_password="hashed_password",
+            is_active=True,
+        )
+        db_session.add(test_user)
+        db_session.commit()
+        test_item = Item(title="Test Item", price=100, owner_id=test_user.id)
+        db_session.add(test_item)
+        db_session.commit()
+        item_id = test_item.id
+
+        assert get_item_owner(db_session, item_id) == test_user.id
+
+        # Another owner cannot delete the item
+        assert delete_item_if_owner(db_session, item_id, owner_id=999) == (
+            True,
+            False,
+        )
+
+        # The owner can
+        assert delete_item_if_owner(db_session, item_id, test_user.id) == (True, True)
+        assert get_item_by_id(db_session, item_id) is None
+
+        # A missing item is reported as such
+        assert get_item_owner(db_session, item_id) is None
+        assert delete_item_if_owner(db_session, item_id, test_user.id) == (
+            False,
+            False,
+        )
+
+    def test_delete_item_not_found(self, db_session):
         """Test deleting a non-existent item."""
-        # Create test database
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            success = delete_item(session, 999)
-            assert success is False
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    def test_get_items(self):
+        success = delete_item(db_session, 999)
+        assert success is False
+
+    def test_get_items(self, db_session):
         """Test getting all items."""
-        # Create test database, user, and items
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            # Create a test user
-            test_user = User(
-                email="test@example.com",
-                username="testuser",
-                hashed_password="hashed_password",
-                full_name="Test User",
-                is_active=True,
-            )
-            session.add(test_user)
-            session.commit()
-            session.refresh(test_user)
-
-            # Create test items
-            item1 = Item(
-                title="Item 1",
-                description="Description 1",
-                price=100,
-                owner_id=test_user.id,
-            )
-            item2 = Item(
-                title="Item 2",
-                description="Description 2",
-                price=200,
-                owner_id=test_user.id,
-            )
-            session.add_all([item1, item2])
-            session.commit()
-
-            # Test getting all items
-            items = get_items(session)
-            assert len(items) == 2
-            assert any(item.title == "Item 1" for item in items)
-            assert any(item.title == "Item 2" for item in items)
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    def test_get_items_by_owner(self):
+        # Create a test user
+        test_user = User(
+            email="test@example.com",
+            username="testuser",
+            hashed_password="hashed_password",
+            full_name="Test User",
+            is_active=True,
+        )
+        db_session.add(test_user)
+        db_session.commit()
+
+        # Create test items
+        db_session.execute(
+            insert(Item),
+            [
+                {
+                    "title": "Item 1",
+                    "description": "Description 1",
+                    "price": 100,
+                    "owner_id": test_user.id,
+                },
+                {
+                    "title": "Item 2",
+                    "description": "Description 2",
+                    "price": 200,
+                    "owner_id": test_user.id,
+                },
+            ],
+        )
+        db_session.commit()
+
+        # Test getting all items
+        items = get_items(db_session)
+        assert len(items) == 2
+        assert any(item.title == "Item 1" for item in items)
+        assert any(item.title == "Item 2" for item in items)
+
+    def test_get_items_by_owner(self, db_session):
         """Test getting items by owner."""
-        # Create test database, users, and items
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-
-        try:
-            # Create test users
-            user1 = User(
-                email="user1@example.com",
-                username="user1",
-                hashed_password="hashed_password",
-                full_name="User 1",
-                is_active=True,
-            )
-            user2 = User(
-                email="user2@example.com",
-                username="user2",
-                hashed_password="hashed_password",
-                full_name="User 2",
-                is_active=True,
-            )
-            session.add_all([user1, user2])
-            session.commit()
-            session.refresh(user1)
-            session.refresh(user2)
-
-            # Create test items
-            item1 = Item(
-                title="User1 Item",
-                description="Description",
-                price=100,
-                owner_id=user1.id,
-            )
-            item2 = Item(
-                title="User2 Item",
-                description="Description",
-                price=200,
-                owner_id=user2.id,
-            )
-            session.add_all([item1, item2])
-            session.commit()
-
-            # Test getting items by owner
-            user1_items = get_items(session, owner_id=user1.id)
-            assert len(user1_items) == 1
-            assert user1_items[0].title == "User1 Item"
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
-
-    def test_get_items_count(self):
+        # Create test users
+        user1 = User(
+            email="user1@example.com",
+            username="user1",
+            hashed_password="hashed_password",
+            full_name="User 1",
+            is_active=True,
+        )
+        user2 = User(
+            email="user2@example.com",
+            username="user2",
+            hashed_password="hashed_password",
+            full_name="User 2",
+            is_active=True,
+        )
+        db_session.add_all([user1, user2])
+        db_session.commit()
+
+        # Create test items
+        db_session.execute(
+            insert(Item),
+            [
+                {
+                    "title": "User1 Item",
+                    "description": "Description",
+                    "price": 100,
+                    "owner_id": user1.id,
+                },
+                {
+                    "title": "User2 Item",
+                    "description": "Description",
+                    "price": 200,
+                    "owner_id": user2.id,
+                },
+            ],
+        )
+        db_session.commit()
+
+        # Test getting items by owner
+        user1_items = get_items(db_session, owner_id=user1.id)
+        assert len(user1_items) == 1
+        assert user1_items[0].title == "User1 Item"
+
+    def test_get_items_count(self, db_session):
         """Test getting items count."""
-        # Create test database, user, and items
-        Base.metadata.create_all(bind=test_engine)
-        session = TestSessionLocal()
-        try:
-            # Create a test user
-            test_user = User(
-                email="test@example.com",
-                username="testuser",
-                hashed_password="hashed_password",
-                full_name="Test User",
-                is_active=True,
-            )
-            session.add(test_user)
-            session.commit()
-            session.refresh(test_user)
-
-            # Create test items
-            item1 = Item(
-                title="Item 1",
-                description="Description 1",
-                price=100,
-                owner_id=test_user.id,
-            )
-            item2 = Item(
-                title="Item 2",
-                description="Description 2",
-                price=200,
-                owner_id=test_user.id,
-            )
-            session.add_all([item1, item2])
-            session.commit()
-
-            # Test getting items count
-            count = get_items_count(session)
-            assert count == 2
-        finally:
-            session.close()
-            Base.metadata.drop_all(bind=test_engine)
+        # Create a test user
+        test_user = User(
+            email="test@example.com",
+            username="testuser",
+            hashed_password="hashed_password",
+            full_name="Test User",
+            is_active=True,
+        )
+        db_session.add(test_user)
+        db_session.commit()
+
+        # Create test items
+        db_session.execute(
+            insert(Item),
+            [
+                {
+                    "title": "Item 1",
+                    "description": "Description 1",
+                    "price": 100,
+                    "owner_id": test_user.id,
+                },
+                {
+                    "title": "Item 2",
+                    "description": "Description 2",
+                    "price": 200,
+                    "owner_id": test_user.id,
+                },
+            ],
+        )
+        db_session.commit()
+
+        # Test getting items count
+        count = get_items_count(db_session)
+        assert count == 2
+
+    def test_get_items_page(self, db_session):
+        """Test getting a page of items together with the total count."""
+        # Create a test user
+        test_user = User(
+            email="test@example.com",
+            username="testuser",
+            hashed_password="hashed_password",
+            full_name="Test User",
+            is_active=True,
+        )
+        db_session.add(test_user)
+        db_session.commit()
+
+        # Create test items
+        db_session.execute(
+            insert(Item),
+            [
+                {
+                    "title": f"Item {i}",
+                    "description": f"Description {i}",
+                    "price": 100 * i,
+                    "owner_id": test_user.id,
+                }
+                for i in range(1, 4)
+            ],
+        )
+        db_session.commit()
+
+        # Test getting a partial page
+        items, total = get_items_page(db_session, skip=0, limit=2)
+        assert len(items) == 2
+        assert total == 3
+
+        # Test getting a page past the end still reports the total
+        items, total = get_items_page(db_session, skip=10, limit=2)
+        assert items == []
+        assert total == 3
+
+        # Test continuing from a cursor keeps the full total
+        first_page, _ = get_items_page(db_session, limit=2)
+        items, total = get_items_page(db_session, limit=2, after_id=first_page[-1].id)
+        assert [item.title for item in items] == ["Item 3"]
+        assert total == 3
@@ -9,11 +9,20 @@ from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from app.database import Base, SessionLocal, drop_db, engine, get_db, init_db, reset_db
+from app.database import (
+    Base,
+    SessionLocal,
+    drop_db,
+    engine,
+    get_db,
+    init_db,
+    reset_db,
+    session_scope,
+)
 
 # Create a test database for these tests
 test_engine = create_engine(
-    "sqlite:///./test_unit.db",
+    "sqlite://",
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
@@ -55,8 +64,29 @@ class TestDatabaseSession:
             finally:
                 db_gen.close()
 
-            # Verify session was closed
-            mock_session.close.assert_called_once()
+            # Verify session was released outside of a request scope
+            mock_session_local.remove.assert_called_once()
+
+    def test_get_db_keeps_request_scoped_session(self):
+        """Test that get_db leaves request-scoped sessions to session_scope."""
+        with patch("app.database.SessionLocal") as mock_session_local:
+            with session_scope():
+                db_gen = get_db()
+                next(db_gen)
+                db_gen.close()
+
+                mock_session_local.remove.assert_not_called()
+
+            mock_session_local.remove.assert_called_once()
+
+    def test_session_scope_shares_session(self):
+        """Test that one session is shared within a scope but not across scopes."""
+        with session_scope():
+            first = SessionLocal()
+            assert SessionLocal() is first
+
+        with session_scope():
+            assert SessionLocal() is not first
 
 
 class TestDatabaseInitialization:
@@ -134,13 +164,12 @@ class TestDatabaseEngine:
         assert hasattr(engine, "pool")
 
 
+# These tests only run SELECT 1 on fresh sessions, so they need no schema
 class TestDatabaseIntegration:
     """Integration tests for database operations."""
 
     def test_database_connection(self):
         """Test that we can connect to the database and execute queries."""
-        # Create a test session
-        Base.metadata.create_all(bind=test_engine)
         session = TestSessionLocal()
         try:
             # Execute a simple query to test connection
@@ -148,12 +177,9 @@ class TestDatabaseIntegration:
             assert result.scalar() == 1
         finally:
             session.close()
-            Base.metadata.drop_all(bind=test_engine)
 
     def test_database_transaction_rollback(self):
         """Test that database transactions can be rolled back."""
-        # Create a test session
-        Base.metadata.create_all(bind=test_engine)
         session = TestSessionLocal()
 
         try:
@@ -172,24 +198,18 @@ class TestDatabaseIntegration:
             assert result.scalar() == 1
         finally:
             session.close()
-            Base.metadata.drop_all(bind=test_engine)
 
     def test_database_session_cleanup(self):
         """Test that database sessions are properly cleaned up."""
-        # Create a test session
-        Base.metadata.create_all(bind=test_engine)
         session = TestSessionLocal()
 
-        try:
-            # Execute a query
-            result = session.execute(text("SELECT 1"))
-            assert result.scalar() == 1
+        # Execute a query
+        result = session.execute(text("SELECT 1"))
+        assert result.scalar() == 1
 
-            # Close the session
-            session.close()
-            # No assertion about closed state; just ensure no error is raised
-        finally:
-            Base.metadata.drop_all(bind=test_engine)
+        # Close the session
+        session.close()
+        # No assertion about closed state; just ensure no error is raised
 
 
 class TestDatabaseErrorHandling:
@@ -1,12 +1,15 @@
 from datetime import datetime
 from unittest.mock import MagicMock, patch
 
-from fastapi.testclient import TestClient
-
 from app.config import settings
+from app.database import get_db
 from app.main import app
 
-client = TestClient(app)
+
+def override_db(db):
+    """Serve the given session from the get_db dependency."""
+    return patch.dict(app.dependency_overrides, {get_db: lambda: db})
+
 
 # Helper: full item dict matching Item schema
 FULL_ITEM = {
@@ -32,17 +35,17 @@ FULL_ITEM = {
 
 
 class TestRootEndpoint:
-    def test_root_endpoint_debug(self):
+    def test_root_endpoint_debug(self, app_client):
         with patch.object(settings, "debug", True):
-            response = client.get("/")
+            response = app_client.get("/")
             assert response.status_code == 200
             data = response.json()
             assert data["message"] == "Welcome to Buildship FastAPI"
             assert data["docs"] == "/docs"
 
-    def test_root_endpoint_no_debug(self):
+    def test_root_endpoint_no_debug(self, app_client):
         with patch.object(settings, "debug", False):
-            response = client.get("/")
+            response = app_client.get("/")
             assert response.status_code == 200
             data = response.json()
             assert data["message"] == "Welcome to Buildship FastAPI"
@@ -50,39 +53,33 @@ class TestRootEndpoint:
 
 
 class TestHealthCheck:
-    def test_health_check_healthy(self):
-        with patch("app.main.get_db") as mock_get_db, patch("app.main.init_db"):
-            db = MagicMock()
-            db.execute.return_value = None
-            mock_get_db.return_value = (x for x in [db])
-            response = client.get("/health")
+    def test_health_check_healthy(self, app_client):
+        db = MagicMock()
+        db.execute.return_value = None
+        with override_db(db), patch("app.main.init_db"):
+            response = app_client.get("/health")
             assert response.status_code == 200
             data = response.json()
             assert data["status"] == "healthy"
             assert data["database"] == "healthy"
 
-    def test_health_check_unhealthy(self):
-        with patch("app.main.get_db") as mock_get_db:
-            db = MagicMock()
-            db.execute.side_effect = Exception("DB error")
-            mock_get_db.return_value = (x for x in [db])
-            response = client.get("/health")
+    def test_health_check_unhealthy(self, app_client):
+        db = MagicMock()
+        db.execute.side_effect = Exception("DB error")
+        with override_db(db), patch("app.main.init_db") as mock_init_db:
+            response = app_client.get("/health")
             assert response.status_code == 200
             data = response.json()
-            # Accept either 'unhealthy' or 'healthy' depending on fallback
-            # logic
-            assert data["status"] in ("unhealthy", "healthy")
-            assert data["database"] in ("unhealthy", "healthy")
-
-    def test_health_check_init_db_exception(self):
-        with patch("app.main.get_db") as mock_get_db, patch(
-            "app.main.init_db"
-        ) as mock_init_db:
-            db = MagicMock()
-            db.execute.return_value = None
+            assert data["status"] == "unhealthy"
+            assert data["database"] == "unhealthy"
+            mock_init_db.assert_not_called()
+
+    def test_health_check_init_db_exception(self, app_client):
+        db = MagicMock()
+        db.execute.return_value = None
+        with override_db(db), patch("app.main.init_db") as mock_init_db:
             mock_init_db.side_effect = Exception("init error")
-            mock_get_db.return_value = (x for x in [db])
-            response = client.get("/health")
+            response = app_client.get("/health")
             assert response.status_code == 200
             data = response.json()
             assert data["status"] == "healthy"
@@ -90,8 +87,8 @@ class TestHealthCheck:
 
 
 class TestMetrics:
-    def test_metrics_endpoint(self):
-        response = client.get("/metrics")
+    def test_metrics_endpoint(self, app_client):
+        response = app_client.get("/metrics")
         assert response.status_code == 200
         data = response.json()
         assert "app_version" in data
@@ -100,15 +97,12 @@ class TestMetrics:
 
 
 class TestPublicItems:
-    def test_public_items_normal(self):
-        with patch("app.main.get_db") as mock_get_db, patch(
-            "app.main.get_items"
-        ) as mock_get_items, patch("app.main.get_items_count") as mock_get_items_count:
-            db = MagicMock()
-            mock_get_db.return_value = (x for x in [db])
-            mock_get_items.return_value = [FULL_ITEM]
-            mock_get_items_count.return_value = 1
-            response = client.get("/public/items")
+    def test_public_items_normal(self, app_client):
+        with override_db(MagicMock()), patch(
+            "app.pagination.get_items_page"
+        ) as mock_get_items_page:
+            mock_get_items_page.return_value = ([FULL_ITEM], 1)
+            response = app_client.get("/public/items?include_total=true")
             assert response.status_code == 200
             data = response.json()
             assert data["total"] == 1
@@ -117,15 +111,12 @@ class TestPublicItems:
             assert data["pages"] == 1
             assert isinstance(data["items"], list)
 
-    def test_public_items_empty(self):
-        with patch("app.main.get_db") as mock_get_db, patch(
-            "app.main.get_items"
-        ) as mock_get_items, patch("app.main.get_items_count") as mock_get_items_count:
-            db = MagicMock()
-            mock_get_db.return_value = (x for x in [db])
-            mock_get_items.return_value = []
-            mock_get_items_count.return_value = 0
-            response = client.get("/public/items")
+    def test_public_items_empty(self, app_client):
+        with override_db(MagicMock()), patch(
+            "app.pagination.get_items_page"
+        ) as mock_get_items_page:
+            mock_get_items_page.return_value = ([], 0)
+            response = app_client.get("/public/items?include_total=true")
             assert response.status_code == 200
             data = response.json()
             assert data["total"] == 0
@@ -134,19 +125,21 @@ class TestPublicItems:
             assert data["pages"] == 0
             assert data["items"] == []
 
-    def test_public_items_paging(self):
-        with patch("app.main.get_db") as mock_get_db, patch(
-            "app.main.get_items"
-        ) as mock_get_items, patch("app.main.get_items_count") as mock_get_items_count:
-            db = MagicMock()
-            mock_get_db.return_value = (x for x in [db])
+    def test_public_items_paging(self, app_client):
+        with override_db(MagicMock()), patch(
+            "app.pagination.get_items_page"
+        ) as mock_get_items_page:
             # 10 full items
-            mock_get_items.return_value = [
-                {**FULL_ITEM, "id": i, "name": f"item{i}", "title": f"Item {i}"}
-                for i in range(10)
-            ]
-            mock_get_items_count.return_value = 25
-            response = client.get("/public/items?skip=10&limit=10")
+            mock_get_items_page.return_value = (
+                [
+                    {**FULL_ITEM, "id": i, "name": f"item{i}", "title": f"Item {i}"}
+                    for i in range(10)
+                ],
+                25,
+            )
+            response = app_client.get(
+                "/public/items?skip=10&limit=10&include_total=true"
+            )
             assert response.status_code == 200
             data = response.json()
             assert data["total"] == 25
@@ -155,18 +148,13 @@ class TestPublicItems:
             assert data["pages"] == 3
             assert isinstance(data["items"], list)
 
-    def test_public_items_with_user(self):
-        with patch("app.main.get_db") as mock_get_db, patch(
-            "app.main.get_items"
-        ) as mock_get_items, patch(
-            "app.main.get_items_count"
-        ) as mock_get_items_count, patch(
+    def test_public_items_with_user(self, app_client):
+        with override_db(MagicMock()), patch(
+            "app.pagination.get_items_page"
+        ) as mock_get_items_page, patch(
             "app.main.get_current_active_user_optional"
         ) as mock_user:
-            db = MagicMock()
-            mock_get_db.return_value = (x for x in [db])
-            mock_get_items.return_value = [FULL_ITEM]
-            mock_get_items_count.return_value = 1
+            mock_get_items_page.return_value = ([FULL_ITEM], 1)
             mock_user.return_value = {
                 "id": 1,
                 "username": "user1",
@@ -177,7 +165,7 @@ class TestPublicItems:
                 "created_at": datetime.utcnow().isoformat(),
                 "updated_at": None,
             }
-            response = client.get("/public/items")
+            response = app_client.get("/public/items?include_total=true")
             assert response.status_code == 200
             data = response.json()
             assert data["total"] == 1
@@ -1,4 +1,5 @@
-from unittest.mock import MagicMock, patch
+import logging
+from unittest.mock import patch
 
 from fastapi import FastAPI
 from starlette.testclient import TestClient
@@ -31,7 +32,13 @@ class TestAPIKeyMiddleware:
         user_agent="test-agent",
         referer=None,
     ):
-        client = TestClient(app)
+        async def with_client_host(scope, receive, send):
+            # Report the requested client address in the ASGI scope
+            if scope["type"] == "http":
+                scope = {**scope, "client": (client_host, 50000)}
+            await app(scope, receive, send)
+
+        client = TestClient(with_client_host)
         extra = {}
         if headers:
             extra["headers"] = headers
@@ -39,12 +46,7 @@ class TestAPIKeyMiddleware:
             if "headers" not in extra:
                 extra["headers"] = {}
             extra["headers"]["referer"] = referer
-        # Patch request.client.host
-        with patch(
-            "starlette.requests.Request.client",
-            new_callable=MagicMock(return_value=MagicMock(host=client_host)),
-        ):
-            return client.get(path, **extra)
+        return client.get(path, **extra)
 
     def test_api_key_disabled(self):
         app = FastAPI()
@@ -72,6 +74,19 @@ class TestAPIKeyMiddleware:
         response = self.make_request(app, headers={"x-api-key": "valid-key"})
         assert response.status_code == 200
 
+    def test_api_key_custom_header(self):
+        app = FastAPI()
+        app.add_middleware(
+            APIKeyMiddleware, settings=DummySettings(api_key_header="X-Custom-Key")
+        )
+
+        @app.get("/")
+        def root():
+            return {"ok": True}
+
+        response = self.make_request(app, headers={"X-Custom-Key": "valid-key"})
+        assert response.status_code == 200
+
     def test_api_key_invalid(self):
         app = FastAPI()
         app.add_middleware(
@@ -165,3 +180,84 @@ class TestSetupMiddleware:
         setup_middleware(app)
         # Check that all middleware classes are present
         assert len(app.user_middleware) > 0
+
+    def test_setup_middleware_skips_disabled_api_key_auth(self):
+        app = FastAPI()
+        with patch("app.middleware.settings", DummySettings(enable_api_key_auth=False)):
+            setup_middleware(app)
+        classes = [middleware.cls for middleware in app.user_middleware]
+        assert APIKeyMiddleware not in classes
+
+    def test_setup_middleware_adds_enabled_api_key_auth(self):
+        app = FastAPI()
+        with patch("app.middleware.settings", DummySettings(enable_api_key_auth=True)):
+            setup_middleware(app)
+        classes = [middleware.cls for middleware in app.user_middleware]
+        assert APIKeyMiddleware in classes
+
+
+class TestResponseHeaders:
+    def test_security_and_timing_headers(self):
+        app = app_with_middleware()
+
+        @app.get("/ping")
+        def ping():
+            return {"ok": True}
+
+        response = TestClient(app).get("/ping")
+        assert response.status_code == 200
+        assert response.headers["x-content-type-options"] == "nosniff"
+        assert response.headers["x-frame-options"] == "DENY"
+        assert response.headers["x-xss-protection"] == "1; mode=block"
+        assert response.headers["referrer-policy"] == "strict-origin-when-cross-origin"
+        assert "max-age=31536000" in response.headers["strict-transport-security"]
+        assert float(response.headers["x-process-time"]) >= 0
+
+
+class TestRequestLogging:
+    def make_app(self):
+        app = app_with_middleware()
+
+        @app.get("/ping")
+        def ping():
+            return {"ok": True}
+
+        @app.get("/boom")
+        def boom():
+            raise RuntimeError("boom")
+
+        return app
+
+    def test_request_logged_at_info(self):
+        with patch("app.middleware.request_logger") as request_logger:
+            response = TestClient(self.make_app()).get("/ping?x=1")
+
+        assert response.status_code == 200
+        request_logger.info.assert_called_once()
+        fields = request_logger.info.call_args.kwargs
+        assert fields["path"] == "/ping"
+        assert fields["query"] == "x=1"
+        assert fields["status_code"] == 200
+
+    def test_failed_request_logged_as_500(self):
+        client = TestClient(self.make_app(), raise_server_exceptions=False)
+        with patch("app.middleware.request_logger") as request_logger:
+            response = client.get("/boom")
+
+        assert response.status_code == 500
+        request_logger.info.assert_called_once()
+        assert request_logger.info.call_args.kwargs["status_code"] == 500
+
+    def test_request_log_skipped_above_info(self):
+        logger = logging.getLogger("app.middleware")
+        with patch("app.middleware.request_logger") as request_logger:
+            logger.setLevel(logging.WARNING)
+            try:
+                response = TestClient(self.make_app()).get("/ping")
+            finally:
+                logger.setLevel(logging.NOTSET)
+
+        assert response.status_code == 200
+        # Headers are still added even when the log event is skipped
+        assert "x-process-time" in response.headers
+        request_logger.info.assert_not_called()